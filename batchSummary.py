@@ -0,0 +1,99 @@
+import os
+import sys
+import csv
+import argparse as argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from bcParser_v1_0 import bcParser, caseSymmetry, CASE_FILES
+
+#row labels in the order pptGeneration reads them back from summary.csv
+SUMMARY_FIELDS = ['Velocity','Iterations','Yaw','Moving Ground','Simulation Type','Turbulence Model','Symmetry']
+SKIP_DIRS = ['postProcessing','constant','system','processor','03_reports']
+
+
+def isTrial(trialPath):
+    return os.path.isfile(os.path.join(trialPath,'caseSetup')) and os.path.isfile(os.path.join(trialPath,'system','controlDict'))
+
+def findTrials(jobDir):
+    #returns (path,trial) for every trial below jobDir without descending into the trials themselves
+    trials = []
+    pending = [jobDir]
+    while pending:
+        current = pending.pop()
+        try:
+            entries = list(os.scandir(current))
+        except OSError:
+            continue
+        for entry in entries:
+            if not entry.is_dir() or entry.name.startswith('.'):
+                continue
+            if any(entry.name.startswith(skip) for skip in SKIP_DIRS):
+                continue
+            if isTrial(entry.path):
+                trials.append((current,entry.name))
+            else:
+                pending.append(entry.path)
+    return sorted(trials)
+
+def summaryValues(trial,config):
+    return [config.inletMag,config.lastTime,config.yaw,config.wheelRotation,
+            config.simType,config.turbModel,caseSymmetry(trial)]
+
+def isCurrent(path,trial,config):
+    #summary.csv is current when it is newer than every file bcParser reads, the #included ones too
+    summaryPath = os.path.join(path,trial,'summary.csv')
+    if not os.path.isfile(summaryPath):
+        return False
+    summaryTime = os.path.getmtime(summaryPath)
+    inputs = [os.path.join(path,trial,caseFile) for caseFile in CASE_FILES] + (config.includes or [])
+    return all(os.path.getmtime(inputPath) <= summaryTime for inputPath in inputs if os.path.exists(inputPath))
+
+def writeSummary(path,trial,config):
+    summaryPath = os.path.join(path,trial,'summary.csv')
+    tmpPath = "%s.%d.tmp" % (summaryPath,os.getpid())
+    with open(tmpPath,'w',newline='') as fp:
+        writer = csv.writer(fp)
+        writer.writerow(['',trial])
+        for field,value in zip(SUMMARY_FIELDS,summaryValues(trial,config)):
+            writer.writerow([field,value])
+    os.replace(tmpPath,summaryPath)
+    return summaryPath
+
+def summarizeTrial(path,trial,force=False):
+    #the parse is served from bcParser's cache when nothing changed
+    config = bcParser(path,trial)
+    if not force and isCurrent(path,trial,config):
+        return trial,'current'
+    writeSummary(path,trial,config)
+    return trial,'written'
+
+def batchSummary(jobDir,workers=None,force=False):
+    trials = findTrials(jobDir)
+    print("Found %d trials under %s" % (len(trials),jobDir))
+    failed = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(summarizeTrial,path,trial,force):trial for path,trial in trials}
+        for future in as_completed(futures):
+            trial = futures[future]
+            try:
+                trial,status = future.result()
+                print("\t%s: summary.csv %s" % (trial,status))
+            except Exception as error:
+                print("\t%s: could not parse case files (%s)" % (trial,error))
+                failed.append(trial)
+    return failed
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog='Batch Summary Writer',description='Parses the case files of every trial below a job directory\
+                                                                    and writes the summary.csv that the report generator reads.')
+    parser.add_argument("jobDir", nargs='?', default=os.getcwd(),
+                        help='Directory to search for trials, defaults to the current directory.')
+    parser.add_argument("-j","--workers", type=int,
+                        help='Number of worker processes, defaults to the number of cores.')
+    parser.add_argument("-f","--force", action="store_true",
+                        help='Rewrites summary.csv even when it is newer than the case files.')
+    args = parser.parse_args()
+
+    failed = batchSummary(os.path.abspath(args.jobDir),args.workers,args.force)
+    if failed:
+        sys.exit("Could not write summary.csv for trials: %s" % (' '.join(failed)))
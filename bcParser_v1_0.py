@@ -1,119 +1,207 @@
-import sys
-import fileinput
 import os
-import getopt
-import re
-import numpy as np
 import configparser
-from termcolor import colored,cprint #REQUIRES PIP INSTALL termcolor
-from tabulate import tabulate #requires pip install tabulate
 import math
+import json
+import threading
+from foamDict import FoamDict
 
 
 #path = os.path.split(os.getcwd())[0]
 #case = os.path.split(os.getcwd())[1]
 
-def assignVar(variable):
-   
-   if variable in varList:
-      varIndex = np.where(varList == variable)
-      variableValue = varVal[varIndex[0]]
-      return variableValue[0]
-   else:
-      variableValue = False
-      return variableValue
+class CaseConfig:
+    """ Parsed metadata for one trial
+        - caseSetup values are held per section in plain dicts, GEOM sections included
+        - unpacks as the old (inletMag,lastTime,yaw,wheelRotation,simType,turbModel) tuple
+    """
+    FIELDS = ['inletMag','lastTime','yaw','wheelRotation','simType','turbModel']
+    #includes: every file the OpenFOAM dictionaries #included, they are inputs like CASE_FILES
+    EXTRA_FIELDS = ['application','includes']
+
+    def __init__(self,sections,**values):
+        self.sections = sections
+        #flat key index over the non GEOM sections, first definition wins as it did with assignVar
+        self._keys = {}
+        for section,items in sections.items():
+            if "GEOM" in section:
+                continue
+            for key,value in items.items():
+                self._keys.setdefault(key,value)
+        for field in self.FIELDS + self.EXTRA_FIELDS:
+            setattr(self,field,values.get(field))
+
+    def get(self,key,section=None,default=False):
+        if section is None:
+            return self._keys.get(key,default)
+        return self.sections.get(section,{}).get(key,default)
+
+    def __getitem__(self,section):
+        return self.sections[section]
+
+    def __contains__(self,key):
+        return key in self._keys
+
+    def __iter__(self):
+        return iter([getattr(self,field) for field in self.FIELDS])
+
+    def geomSections(self):
+        return {section:items for section,items in self.sections.items() if "GEOM" in section}
+
+    def toDict(self):
+        values = {field:getattr(self,field) for field in self.FIELDS + self.EXTRA_FIELDS}
+        return {'sections':self.sections,'values':values}
+
+    @classmethod
+    def fromDict(cls,data):
+        return cls(data['sections'],**data['values'])
+
+    def __repr__(self):
+        values = ', '.join("%s=%r" % (field,getattr(self,field)) for field in self.FIELDS)
+        return "CaseConfig(%s)" % (values)
+
+def caseSymmetry(case):
+    if "_half" in case:
+        return "Half Car"
+    return "Full Car"
 
 def magnitude(vector):
     return math.sqrt(sum(pow(element, 2) for element in vector))
 
-def bcParser(path,case):
-    global varList,varVal
+#### CASE METADATA CACHE ####
+#parsed results are kept in memory for the life of the process and on disk beside each trial,
+#both keyed on the (mtime, size) of every file the parser reads, #included files too
+CACHE_VERSION = 4
+CACHE_FILE = '.bcParserCache.json'
+CASE_FILES = ['caseSetup','system/controlDict','system/caseProperties','constant/turbulenceProperties']
+
+_caseMemo = {}
+_caseMemoLock = threading.Lock()
+
+def includeStamps(includes):
+    #(mtime, size) of the #included files, None for one that is not there (#includeIfPresent)
+    stamp = {}
+    for includePath in includes or []:
+        try:
+            fileStat = os.stat(includePath)
+        except OSError:
+            stamp[includePath] = None
+            continue
+        stamp[includePath] = [fileStat.st_mtime_ns,fileStat.st_size]
+    return stamp
+
+def caseStamp(path,case,includes=None):
+    #(mtime, size) of every input file, any change invalidates the cached metadata,
+    #includes are the #included files the last parse recorded
+    stamp = {}
+    for caseFile in CASE_FILES:
+        fileStat = os.stat(os.path.join(path,case,caseFile))
+        stamp[caseFile] = [fileStat.st_mtime_ns,fileStat.st_size]
+    stamp.update(includeStamps(includes))
+    return stamp
+
+def _readCaseCache(cachePath,path,case):
+    try:
+        with open(cachePath) as fp:
+            cached = json.load(fp)
+    except (OSError,ValueError):
+        return None
+    if cached.get('version') != CACHE_VERSION:
+        return None
+    result = CaseConfig.fromDict(cached['result'])
+    if cached.get('stamp') != caseStamp(path,case,result.includes):
+        return None
+    return result
+
+def _writeCaseCache(cachePath,stamp,result):
+    #written to a temp file and renamed so a concurrent reader never sees half a file,
+    #read-only case trees just go without a disk cache
+    tmpPath = "%s.%d.tmp" % (cachePath,os.getpid())
+    try:
+        with open(tmpPath,'w') as fp:
+            json.dump({'version':CACHE_VERSION,'stamp':stamp,'result':result.toDict()},fp)
+        os.replace(tmpPath,cachePath)
+    except OSError:
+        if os.path.exists(tmpPath):
+            os.remove(tmpPath)
+
+def clearCaseMemo():
+    with _caseMemoLock:
+        _caseMemo.clear()
+
+def bcParser(path,case,useCache=True):
+    if not useCache:
+        return _parseCase(path,case)
+
+    casePath = os.path.realpath(os.path.join(path,case))
+
+    with _caseMemoLock:
+        memo = _caseMemo.get(casePath)
+    if memo is not None and memo[0] == caseStamp(path,case,memo[1].includes):
+        return memo[1]
+
+    cachePath = os.path.join(casePath,CACHE_FILE)
+    result = _readCaseCache(cachePath,path,case)
+    if result is None:
+        #the case files are stamped before they are read, the files they include once known
+        stamp = caseStamp(path,case)
+        result = _parseCase(path,case)
+        stamp.update(includeStamps(result.includes))
+        _writeCaseCache(cachePath,stamp,result)
+    else:
+        stamp = caseStamp(path,case,result.includes)
+
+    with _caseMemoLock:
+        _caseMemo[casePath] = (stamp,result)
+    return result
+
+def readCaseSetup(path,case):
     caseSetupPath="%s/%s/caseSetup" % (path,case)
     config = configparser.ConfigParser()
     config.optionxform = str
-    config.read_file(open(caseSetupPath))
-    configSections = config.sections()
-    variableSet = {}
-    varList = []
-    varVal = []
-    for section in configSections:
-        variableSet[section] = np.array(config.items(section)) 
-        if not "GEOM" in section:
-            #print("  Reading %s values:" % (section))
-            pass
-        for item in np.array(config.items(section)):
-            if not "GEOM" in section:
-                #print("     %s: %s" % (item[0],item[1]))
-                varList = np.append(varList,item[0])
-                varVal = np.append(varVal,item[1])
-   
-    with open('%s/%s/system/controlDict' % (path,case)) as controlDict:
-
-        lines = controlDict.readlines()
-        time = []
-        for line in lines:
-
-            if line.startswith("endTime"):
-
-                time.append(re.findall(r"[-+]?(?:\d*\.*\d+)", line)[0])
-                lastTime = time[0]
-                
-
-            elif line.startswith("application"):
-
-                application = re.search('application\s* (.+?);',line).group(1)
-
-    with open('%s/%s/system/caseProperties' % (path,case)) as caseProperties:
-
-        lines = caseProperties.readlines()
-
-        wheelRotation = False
-
-        for line in lines:
-            if "U" in line:
-
-                inletVel = np.array(re.findall('[0-9]+',line))
-
-                n=0
-				
-                inletVel = map(float,inletVel)
-
-                inletVel = list(inletVel)
-				#print(inletVel)
-
-            elif "rotating" in line:
-                wheelRotation = True
-
-            elif "ground" in line:
-                groundFlag = 1
-                wheelFlag = 0
-
-            elif "*wh*" in line:
-                wheelFlag = 1 
-                groundFlag = 0
-		
-        inletMag = assignVar('INLETMAG')
-        yaw = assignVar('YAW')
-		#print(wheelRotation)
-
-    with open('%s/%s/constant/turbulenceProperties' % (path,case)) as turbProperties:
-        lines = turbProperties.readlines()
-
-        for line in lines:
-            if "simulationType" in line:
-                simType = re.search('simulationType\s* (.+?);',line).group(1)
-                #print(simType)
-            elif "RASModel" in line:
-                turbModel = re.search('RASModel\s* (.+?);',line).group(1)
-                #print(turbModel)
-            elif "LESModel" in line:
-                turbModel = re.search('LESModel\s* (.+?);',line).group(1)
-
-
-
-    return inletMag,lastTime,yaw,wheelRotation,simType,turbModel
-
-
-
-
-
+    with open(caseSetupPath) as caseSetup:
+        config.read_file(caseSetup)
+    sections = {}
+    for section in config.sections():
+        sections[section] = dict(config.items(section))
+    return sections
+
+def turbulenceModel(turbProperties,simType):
+    #newer OpenFOAM keeps the model in a RAS/LES sub-dictionary as RASModel/LESModel or just model
+    coeffs = turbProperties.get(simType)
+    if isinstance(coeffs,FoamDict):
+        for modelKey in ("%sModel" % (simType),'model'):
+            model = coeffs.get(modelKey)
+            if model is not None:
+                return model
+    for modelKey in ('RASModel','LESModel'):
+        model = turbProperties.find(modelKey)
+        if model is not None:
+            return model
+    #laminar cases have no model entry
+    return simType
+
+def _parseCase(path,case):
+    sections = readCaseSetup(path,case)
+    caseSetup = CaseConfig(sections)
+    inletMag = caseSetup.get('INLETMAG')
+    yaw = caseSetup.get('YAW')
+
+    includes = []
+    #an endTime given by a macro or #calc that cannot be worked out is None, the plotters then
+    #fall back to the latest time directory
+    with FoamDict('%s/%s/system/controlDict' % (path,case)) as controlDict:
+        lastTime = controlDict.get('endTime')
+        application = controlDict.get('application')
+        includes += controlDict.includedFiles()
+
+    with FoamDict('%s/%s/system/caseProperties' % (path,case)) as caseProperties:
+        wheelRotation = any("rotating" in word for word in caseProperties.words())
+
+    with FoamDict('%s/%s/constant/turbulenceProperties' % (path,case)) as turbProperties:
+        simType = turbProperties.get('simulationType')
+        turbModel = turbulenceModel(turbProperties,simType)
+        includes += turbProperties.includedFiles()
+
+    return CaseConfig(sections,inletMag=inletMag,lastTime=lastTime,yaw=yaw,
+                      wheelRotation=wheelRotation,simType=simType,turbModel=turbModel,
+                      application=application,includes=sorted(set(includes)))
@@ -0,0 +1,48 @@
+import numpy as np
+
+
+#### MULTI TRIAL BIN ALIGNMENT ####
+#the development bins are cumulative along x, so a trial is taken as nothing before its first bin
+#and its full value after its last one when it is compared with trials binned differently
+
+def symmetryFactors(caseNames):
+    #half car trials are doubled to compare with full cars
+    return np.array([2.0 if "half" in caseName else 1.0 for caseName in caseNames])
+
+def unionGrid(xs):
+    #every bin position of every trial, a trial's own line is exact on this grid
+    return np.unique(np.concatenate(xs))
+
+def commonGrid(xs,nPoints=None):
+    #uniform grid over the extent of all trials, as fine as the most finely binned trial
+    if nPoints is None:
+        nPoints = max(len(x) for x in xs)
+    xMin = min(x.min() for x in xs)
+    xMax = max(x.max() for x in xs)
+    return np.linspace(xMin,xMax,nPoints)
+
+def alignBins(xs,ys,grid,extend=False):
+    """ Interpolates each trial's bin distribution onto grid, returns a (nTrials, nGrid) array
+        - extend: cumulative extension outside a trial's bins (0 before, last value after),
+          otherwise points outside its bins are NaN
+    """
+    values = np.empty((len(xs),len(grid)))
+    for row,(x,y) in enumerate(zip(xs,ys)):
+        order = np.argsort(x,kind='stable')
+        x = x[order]
+        y = y[order]
+        if extend:
+            left,right = 0.0,y[-1]
+        else:
+            left = right = np.nan
+        values[row] = np.interp(grid,x,y,left=left,right=right)
+    return values
+
+def deltaToReference(values,reference=0):
+    """ Cumulative and per bin deltas of every trial against the reference row
+        - cumulative: values - values[reference]
+        - perBin: the increment of the cumulative delta across each grid interval
+    """
+    cumulative = values - values[reference]
+    perBin = np.diff(cumulative,axis=1,prepend=0.0)
+    return cumulative,perBin
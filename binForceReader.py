@@ -0,0 +1,397 @@
+import os
+import mmap
+import json
+import hashlib
+import numpy as np
+
+#a coefficients file needs more than this many lines before it is treated as holding data
+MIN_LINES = 10
+BLOCK_SIZE = 1 << 16
+
+
+def hasEnoughLines(filePath,minLines=MIN_LINES):
+    #counts lines a block at a time and stops as soon as there are more than minLines
+    count = 0
+    lastByte = b'\n'
+    with open(filePath,'rb') as fp:
+        while True:
+            block = fp.read(BLOCK_SIZE)
+            if not block:
+                break
+            count += block.count(b'\n')
+            if count > minLines:
+                return True
+            lastByte = block[-1:]
+    #an unterminated last line still counts as a line
+    if lastByte != b'\n':
+        count += 1
+    return count > minLines
+
+def selectCoeffFile(timePath,lastTime):
+    #the first file named after lastTime with data wins, otherwise the last file with data
+    coeffList = os.listdir(timePath)
+    for coeff in coeffList:
+        if lastTime in coeff and hasEnoughLines(os.path.join(timePath,coeff)):
+            return coeff
+    for coeff in reversed(coeffList):
+        if lastTime not in coeff and hasEnoughLines(os.path.join(timePath,coeff)):
+            return coeff
+    return None
+
+def parseXCoords(line):
+    xCoords = line.replace("#","").replace(":","").replace("x","").replace("co-ords","")
+    return [float(x) for x in xCoords.split()]
+
+def parseForceHeader(line):
+    return line.replace("#","").replace("Time","").split()
+
+def readHeader(fp):
+    #header comment block from the start of the file, returns the offset of the first data row
+    xCoords = []
+    forceHeader = []
+    fp.seek(0)
+    while True:
+        offset = fp.tell()
+        line = fp.readline()
+        if not line:
+            break
+        if not line.startswith(b'#'):
+            if line.strip():
+                break
+            continue
+        line = line.decode()
+        if "x co-ords" in line:
+            xCoords = parseXCoords(line)
+        elif "# Time" in line:
+            forceHeader = parseForceHeader(line)
+    return xCoords,forceHeader,offset
+
+def _isRow(line):
+    #blank lines and the # comments a restarted run leaves between rows are not rows, as in TimeIndex
+    line = line.strip()
+    return bool(line) and not line.startswith(b'#')
+
+def reverseLines(fp,stopOffset=0):
+    #yields the data rows between stopOffset and EOF, last line first, reading a block at a time
+    fp.seek(0,os.SEEK_END)
+    pos = fp.tell()
+    remainder = b''
+    while pos > stopOffset:
+        readSize = min(BLOCK_SIZE,pos - stopOffset)
+        pos -= readSize
+        fp.seek(pos)
+        lines = (fp.read(readSize) + remainder).split(b'\n')
+        remainder = lines[0]
+        for line in reversed(lines[1:]):
+            if _isRow(line):
+                yield line
+    if _isRow(remainder):
+        yield remainder
+
+def rowTime(line):
+    return float(line.split(None,1)[0])
+
+def readBinRow(filePath,time=None):
+    #header from the start and the row for time found by seeking back from EOF, the last row when time is None
+    with open(filePath,'rb') as fp:
+        xCoords,forceHeader,dataOffset = readHeader(fp)
+        for line in reverseLines(fp,dataOffset):
+            if time is not None:
+                lineTime = rowTime(line)
+                if lineTime > float(time):
+                    continue
+                if lineTime < float(time):
+                    #rows are in time order so the requested time is not in this file
+                    break
+            return xCoords,forceHeader,[float(x) for x in line.split()[1:]]
+    return xCoords,forceHeader,[]
+
+
+class TimeIndex:
+    """ Byte offsets of every time row in a binForceCoeffs file
+        - the file is memory mapped and rows are parsed straight out of the map
+        - the offsets are cached beside the file in <file>.tidx.npz and extended in place
+          when a running job appends rows
+        - a changed header, a shrunk file or a last indexed row that no longer matches (the file
+          was rewritten rather than appended to) forces a rebuild
+    """
+    INDEX_SUFFIX = '.tidx.npz'
+
+    def __init__(self,filePath):
+        self.filePath = filePath
+        self.indexPath = filePath + self.INDEX_SUFFIX
+        with open(filePath,'rb') as fp:
+            self.xCoords,self.forceHeader,self.dataOffset = readHeader(fp)
+            self._map = mmap.mmap(fp.fileno(),0,access=mmap.ACCESS_READ)
+        self._headerHash = hashlib.sha1(self._map[:self.dataOffset]).hexdigest()
+        self._load()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self,*exc):
+        self.close()
+
+    def close(self):
+        self._map.close()
+
+    def __len__(self):
+        return len(self.times)
+
+    def _reset(self):
+        self.times = np.empty(0)
+        self.offsets = np.empty(0,dtype=np.int64)
+        self.ends = np.empty(0,dtype=np.int64)
+        self._lastRowHash = ''
+
+    def _rowHash(self,offsets,ends):
+        #sha1 of the last indexed row as it is in the map now
+        if not len(offsets):
+            return ''
+        return hashlib.sha1(self._map[int(offsets[-1]):int(ends[-1])]).hexdigest()
+
+    def _load(self):
+        self._reset()
+        indexedEnd = self.dataOffset
+        try:
+            with np.load(self.indexPath) as cached:
+                if (str(cached['headerHash']) == self._headerHash and int(cached['indexedEnd']) <= len(self._map)
+                        and str(cached['lastRowHash']) == self._rowHash(cached['offsets'],cached['ends'])):
+                    self.times = cached['times']
+                    self.offsets = cached['offsets']
+                    self.ends = cached['ends']
+                    self._lastRowHash = str(cached['lastRowHash'])
+                    indexedEnd = int(cached['indexedEnd'])
+        except (OSError,KeyError,ValueError):
+            pass
+        if indexedEnd < len(self._map):
+            self._extend(indexedEnd)
+
+    def _extend(self,pos):
+        #indexes the complete rows after pos, a partly written last row is left for the next call
+        times = []
+        offsets = []
+        ends = []
+        buf = self._map
+        size = len(buf)
+        while pos < size:
+            lineEnd = buf.find(b'\n',pos)
+            if lineEnd < 0:
+                break
+            fields = buf[pos:min(lineEnd,pos + 64)].split(None,1)
+            if fields and not fields[0].startswith(b'#'):
+                times.append(float(fields[0]))
+                offsets.append(pos)
+                ends.append(lineEnd)
+            pos = lineEnd + 1
+        if not times:
+            return
+        self.times = np.concatenate([self.times,times])
+        self.offsets = np.concatenate([self.offsets,np.array(offsets,dtype=np.int64)])
+        self.ends = np.concatenate([self.ends,np.array(ends,dtype=np.int64)])
+        self._lastRowHash = self._rowHash(self.offsets,self.ends)
+        self._save(pos)
+
+    def _save(self,indexedEnd):
+        tmpPath = "%s.%d.tmp.npz" % (self.filePath,os.getpid())
+        try:
+            np.savez(tmpPath,times=self.times,offsets=self.offsets,ends=self.ends,
+                     indexedEnd=indexedEnd,headerHash=self._headerHash,lastRowHash=self._lastRowHash)
+            os.replace(tmpPath,self.indexPath)
+        except OSError:
+            #read-only case trees just rebuild the index each time
+            if os.path.exists(tmpPath):
+                os.remove(tmpPath)
+
+    def refresh(self):
+        #picks up rows appended since the index was built, a rewritten file is indexed again
+        with open(self.filePath,'rb') as fp:
+            xCoords,forceHeader,dataOffset = readHeader(fp)
+            newMap = mmap.mmap(fp.fileno(),0,access=mmap.ACCESS_READ)
+        self._map.close()
+        self._map = newMap
+        indexedEnd = int(self.ends[-1]) + 1 if len(self.ends) else self.dataOffset
+        headerHash = hashlib.sha1(newMap[:dataOffset]).hexdigest()
+        if (headerHash != self._headerHash or indexedEnd > len(newMap)
+                or self._rowHash(self.offsets,self.ends) != self._lastRowHash):
+            self.xCoords,self.forceHeader,self.dataOffset = xCoords,forceHeader,dataOffset
+            self._headerHash = headerHash
+            self._reset()
+            indexedEnd = dataOffset
+        if indexedEnd < len(self._map):
+            self._extend(indexedEnd)
+
+    def rowIndex(self,time):
+        #position of the row at time, or of the last row before it
+        i = np.searchsorted(self.times,float(time),side='right') - 1
+        if i < 0:
+            raise KeyError("Time %s is before the first row of %s" % (time,self.filePath))
+        return int(i)
+
+    def rowHash(self,i):
+        #sha1 of row i as it is in the file now
+        return hashlib.sha1(self._map[self.offsets[i]:self.ends[i]]).hexdigest()
+
+    def rowAt(self,i):
+        line = self._map[self.offsets[i]:self.ends[i]]
+        return np.array(line.split()[1:],dtype=float)
+
+    def row(self,time,exact=True):
+        i = self.rowIndex(time)
+        if exact and self.times[i] != float(time):
+            raise KeyError("Time %s not found in %s" % (time,self.filePath))
+        return self.times[i],self.rowAt(i)
+
+    def rowSlice(self,start,stop):
+        #rows start..stop-1 as one 2-D array, parsed from a single slice of the map
+        if stop <= start:
+            return np.empty(0),np.empty((0,len(self.forceHeader)))
+        text = self._map[self.offsets[start]:self.ends[stop-1]]
+        if b'#' in text:
+            #comment lines between the rows are not in the index
+            text = b'\n'.join(line for line in text.split(b'\n') if not line.lstrip().startswith(b'#'))
+        block = np.array(text.split(),dtype=float)
+        block = block.reshape(stop - start,-1)
+        return block[:,0],block[:,1:]
+
+    def window(self,startTime,endTime):
+        start = int(np.searchsorted(self.times,float(startTime),side='left'))
+        stop = int(np.searchsorted(self.times,float(endTime),side='right'))
+        return self.rowSlice(start,stop)
+
+
+AVERAGE_CHUNK_ROWS = 256
+
+CACHE_SUFFIX = '.npycache'
+CACHE_CHUNK_ROWS = 1024
+
+def _sourceStamp(filePath):
+    fileStat = os.stat(filePath)
+    return [fileStat.st_mtime_ns,fileStat.st_size]
+
+def _readHistoryCache(cacheDir):
+    try:
+        with open(os.path.join(cacheDir,'meta.json')) as fp:
+            meta = json.load(fp)
+        times = np.load(os.path.join(cacheDir,'times.npy'),mmap_mode='r')
+        rows = np.load(os.path.join(cacheDir,'coeffs.npy'),mmap_mode='r')
+    except (OSError,ValueError):
+        return None
+    if len(times) != len(rows):
+        return None
+    return meta,times,rows
+
+def _writeMeta(cacheDir,meta):
+    #written to a temp file and renamed, a reader never sees half a meta.json
+    metaPath = os.path.join(cacheDir,'meta.json')
+    tmpPath = "%s.%d.tmp" % (metaPath,os.getpid())
+    with open(tmpPath,'w') as fp:
+        json.dump(meta,fp)
+    os.replace(tmpPath,metaPath)
+
+def _appendedTo(meta,stamp,timeIndex,nCached):
+    #the source only grew since it was cached: it is no smaller and the last cached row is unchanged,
+    #a run rewritten in place with the same times but other coefficients fails the row hash
+    if meta.get('stamp') is None or meta['stamp'][1] > stamp[1] or not 0 < nCached <= len(timeIndex):
+        return False
+    return meta.get('lastRowHash') == timeIndex.rowHash(nCached - 1)
+
+def _writeHistoryCache(filePath,cacheDir,stamp,cached):
+    #rows are copied into an .npy memmap a chunk at a time, rows from an older cache of the same
+    #file are copied across as binary when the file was appended to, so a growing run only parses
+    #its new rows
+    os.makedirs(cacheDir,exist_ok=True)
+    tmpTimes = os.path.join(cacheDir,'times.%d.tmp.npy' % (os.getpid()))
+    tmpRows = os.path.join(cacheDir,'coeffs.%d.tmp.npy' % (os.getpid()))
+    with TimeIndex(filePath) as timeIndex:
+        nRows = len(timeIndex)
+        nCols = len(timeIndex.rowAt(0)) if nRows else len(timeIndex.forceHeader)
+        reuse = 0
+        if cached is not None:
+            meta,oldTimes,oldRows = cached
+            if (meta['forceHeader'] == timeIndex.forceHeader and oldRows.shape[1:] == (nCols,)
+                    and _appendedTo(meta,stamp,timeIndex,len(oldTimes))
+                    and np.array_equal(oldTimes,timeIndex.times[:len(oldTimes)])):
+                reuse = len(oldTimes)
+        times = np.lib.format.open_memmap(tmpTimes,mode='w+',dtype=np.float64,shape=(nRows,))
+        rows = np.lib.format.open_memmap(tmpRows,mode='w+',dtype=np.float64,shape=(nRows,nCols))
+        if reuse:
+            times[:reuse] = oldTimes
+            rows[:reuse] = oldRows
+        for chunkStart in range(reuse,nRows,CACHE_CHUNK_ROWS):
+            chunkStop = min(chunkStart + CACHE_CHUNK_ROWS,nRows)
+            times[chunkStart:chunkStop],rows[chunkStart:chunkStop] = timeIndex.rowSlice(chunkStart,chunkStop)
+        times.flush()
+        rows.flush()
+        del times,rows
+        meta = {'stamp':stamp,'xCoords':timeIndex.xCoords,'forceHeader':timeIndex.forceHeader,
+                'lastRowHash':timeIndex.rowHash(nRows - 1) if nRows else None}
+    #the old meta is withdrawn before the arrays are replaced and the new one written after, so a
+    #crash in between leaves a cache that matches no source and is rebuilt in full
+    _writeMeta(cacheDir,dict(meta,stamp=None,lastRowHash=None))
+    os.replace(tmpTimes,os.path.join(cacheDir,'times.npy'))
+    os.replace(tmpRows,os.path.join(cacheDir,'coeffs.npy'))
+    _writeMeta(cacheDir,meta)
+
+def loadHistory(filePath):
+    #times and the full bin history as one 2-D array, memory mapped from <file>.npycache which is
+    #keyed on the source mtime and size and rebuilt (or extended) when the source changes
+    cacheDir = filePath + CACHE_SUFFIX
+    stamp = _sourceStamp(filePath)
+    cached = _readHistoryCache(cacheDir)
+    if cached is None or cached[0]['stamp'] != stamp:
+        try:
+            _writeHistoryCache(filePath,cacheDir,stamp,cached)
+            cached = _readHistoryCache(cacheDir)
+        except OSError:
+            cached = None
+        if cached is None:
+            #read-only case trees parse straight into memory
+            with TimeIndex(filePath) as timeIndex:
+                times,rows = timeIndex.rowSlice(0,len(timeIndex))
+                return timeIndex.xCoords,timeIndex.forceHeader,times,rows
+    meta,times,rows = cached
+    return meta['xCoords'],meta['forceHeader'],times,rows
+
+def historyRow(filePath,time=None,exact=True):
+    #(xCoords, forceHeader, rowTime, row) of the row at time, the last row before it when not exact,
+    #or the last row when time is None, served from the memory mapped history
+    xCoords,forceHeader,times,rows = loadHistory(filePath)
+    if len(times) < 1:
+        raise KeyError("No time rows in %s" % (filePath))
+    i = len(times) - 1 if time is None else int(np.searchsorted(times,float(time),side='right')) - 1
+    if i < 0 or (exact and time is not None and times[i] != float(time)):
+        raise KeyError("Time %s not found in %s" % (time,filePath))
+    return xCoords,forceHeader,float(times[i]),np.array(rows[i])
+
+def historyTime(filePath):
+    #mtime of the history cache of filePath, of the file itself when it has none (read-only trees)
+    try:
+        return os.path.getmtime(os.path.join(filePath + CACHE_SUFFIX,'meta.json'))
+    except OSError:
+        return os.path.getmtime(filePath)
+
+def forwardAverage(filePath,avgStart,endTime=None,chunkRows=AVERAGE_CHUNK_ROWS):
+    #running mean of the rows from avgStart up to endTime (or the last row), taken chunkRows rows at
+    #a time from the memory mapped history so only one chunk is resident whatever the run length,
+    #the end row is returned alongside and stands in for the mean when there are no rows to average
+    xCoords,forceHeader,times,rows = loadHistory(filePath)
+    if len(times) < 1:
+        raise ValueError("No time rows in %s" % (filePath))
+    if endTime is None:
+        stop = len(times)
+    else:
+        stop = int(np.searchsorted(times,float(endTime),side='right'))
+        if stop < 1:
+            raise KeyError("Time %s is before the first row of %s" % (endTime,filePath))
+    endRow = np.array(rows[stop - 1])
+    start = int(np.searchsorted(times,float(avgStart),side='left'))
+    mean = np.zeros_like(endRow)
+    count = 0
+    for chunkStart in range(start,stop,chunkRows):
+        chunk = rows[chunkStart:min(chunkStart + chunkRows,stop)]
+        count += len(chunk)
+        mean += (chunk.mean(axis=0) - mean) * (len(chunk) / count)
+    if count == 0:
+        mean = endRow.copy()
+    return xCoords,forceHeader,endRow,mean,count
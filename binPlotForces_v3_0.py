@@ -1,362 +1,489 @@
-import sys
-import os
-import pandas as pd
-import argparse as argparse
-import matplotlib.pyplot as plt
-from itertools import repeat
-import seaborn as sns 
-import numpy as np
-from PIL import Image
-import cv2
-from matplotlib.ticker import AutoMinorLocator, MultipleLocator
-from matplotlib.offsetbox import (OffsetImage, AnnotationBbox)
-from bcParser_v1_0 import bcParser
-
-path = os.path.split(os.getcwd())[0]
-case = os.path.split(os.getcwd())[1]
-params = {'mathtext.default': 'regular' }          
-plt.rcParams.update(params)
-
-parser = argparse.ArgumentParser(prog='Force Development Plotter',description='Will plot force development and forward average values if sufficient iterations available.\
-                                                                    If there are insufficient time steps for averaging, the forward average line will be equal\
-                                                                    to the raw force integral line.')
-parser.add_argument("-t","--caseNames", metavar='trial',nargs='+',
-                    help='Additional trials to be plotted, if doing current trial, leave blank!')
-                    
-parser.add_argument('-a',"--forwardAvg", metavar='avgStart', type=float, 
-                    help='Time to start forward averaging')
-
-parser.add_argument("-s","--save", action="store_true",
-                    help='Saves all plots (regardless if -p options are used) to current trial.')
-
-parser.add_argument("-n","--noShow", action="store_true",
-                    help='Does not show plots.')                  
-
-parser.add_argument("-i","--noImage", action="store_true",
-                    help='Does not show geometry image.')    
-                    
-args = parser.parse_args()
-
-
-save = args.save
-noShow = args.noShow
-noImage = args.noImage    
-
-if args.caseNames is None:
-    caseNames = [case]
-else:
-    caseNames = args.caseNames
-    caseNames = [case] + caseNames
-
-
-
-#check if all the cases listed can be found can be found, and checking that it's type is the same
-
-def findCase(caseName):
-    global inletMag,lastTime,yaw,wheelRotation,simType,turbModel
-    if os.path.isdir("%s/%s" % (path,caseName)):
-        print("     Found trial%s..." % (caseName))
-        [inletMag,lastTime,yaw,wheelRotation,simType,turbModel] = bcParser(path,caseName)
-        print("         Simulation Type: %s\n" % (simType))
-        
-    else:
-        sys.exit("  Trial%s not found! Check your entry!\n" % (caseName))
-    
-def check(lst):
-    # Use the repeat function to generate an iterator that returns the first element of the list repeated len(lst) times
-    repeated = list(repeat(lst[0], len(lst)))
-    # Compare the repeated list to the original list and return the result
-    if not repeated == lst:
-        sys.exit("Simulation type not consistent! Exiting!")
-
-def getGeomImage(path,caseName):
-    imagePath = "%s/%s/postProcessing/images/Geom_Surface/%s_Geom_Surface_Left.png" % (path,caseName,caseName)
-    if not os.path.isfile(imagePath):
-        #sys.exit("     Cannot find geometry image for trial%s, exiting..." % (caseName))
-        print("     Cannot find geometry image for trial%s, skipping for this trial..." % (caseName))
-        SKIPIMAGE = True
-        ROI = []
-        return ROI, SKIPIMAGE
-    elif noImage == True:
-        print("     Not showing car geometry images...")
-        SKIPIMAGE = True
-        ROI = []
-        return ROI, SKIPIMAGE
-
-    else:
-        ROI = convertImage(imagePath)
-        SKIPIMAGE = False
-        return ROI, SKIPIMAGE
-        
-    
-    
-def convertImage(imagePath):
-    # Load image, convert to grayscale, Gaussian blur, Otsu's threshold
-    image = cv2.imread(imagePath)
-    original = image.copy()
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    blur = cv2.GaussianBlur(gray, (3,3), 0)
-    thresh = cv2.threshold(blur, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)[1]
-
-    # Obtain bounding rectangle and extract ROI
-    x,y,w,h = cv2.boundingRect(thresh)
-    cv2.rectangle(image, (x, y), (x + w, y + h), (36,255,12), 2)
-    ROI = original[y:y+h, x:x+w]
-
-    # Add alpha channel
-    b,g,r = cv2.split(ROI)
-    alpha = np.ones(b.shape, dtype=b.dtype) * 70
-    ROI = cv2.merge([b,g,r,alpha])
-
-    #cv2.imshow('thresh', thresh)
-    #cv2.imshow('image', image)
-    #cv2.imshow('ROI', ROI)
-    #cv2.waitKey()
-    return ROI
-     
-
-def importBinData(path,caseName):
-    xCoords = []
-    forceHeader = []
-    forceCoeffs = []
-    [inletMag,lastTime,yaw,wheelRotation,simType,turbModel] = bcParser(path,caseName)
-    
-    timeList = os.listdir("%s/%s/postProcessing/binForceCoeffs/" % (path,caseName))
-    if not lastTime in timeList:
-        lastTime = max(timeList)
-        print("End time specified in controlDict does not match available times. Using lastest available time %s" % (lastTime))
-    
-    if not os.path.isdir("%s/%s/postProcessing/binForceCoeffs/%s/" % (path,caseName,lastTime)):
-        sys.exit("Bin forces export might not have been run successfully for trial %s, please check your log files!" % (caseName))
-    
-    coeffList = os.listdir("%s/%s/postProcessing/binForceCoeffs/%s/" % (path,caseName,lastTime))
-    
-    if len(coeffList) < 1:
-        sys.exit("Bin forces export might not have been run successfully for trial %s, please check your log files!" % (caseName))
-    
-    for coeff in coeffList:
-        filePath = "%s/%s/postProcessing/binForceCoeffs/%s/%s" % (path,caseName,lastTime,coeff)
-        
-        with open(r"%s/%s/postProcessing/binForceCoeffs/%s/%s" % (path,caseName,lastTime,coeff), 'r') as fp:
-            lines = len(fp.readlines())
-            
-            
-        if lines > 10 and lastTime in coeff:
-            binCoeff = coeff
-            break
-        elif lines > 10:
-            binCoeff = coeff
-    
-
-    if binCoeff == "":
-        sys.exit("None of the coefficients files in trial %s have enough data!" % (caseName))
-                
-                
-    
-        
-    with open(r"%s/%s/postProcessing/binForceCoeffs/%s/%s" % (path,caseName,lastTime,binCoeff), 'r') as fp:
-        for line in fp:
-            if "x co-ords" in line:
-                xCoords =  line.replace("#","").replace(":","").replace("x","").replace("co-ords","")
-                xCoords = xCoords.split()
-                xCoords = [float(x) for x in xCoords]
-            elif "# Time" in line:
-                forceHeader = line.replace("#","").replace("Time","")
-                forceHeader = forceHeader.split()
-            elif lastTime in line:
-                forceCoeffs = line.replace(lastTime,"")
-                forceCoeffs = forceCoeffs.split()
-                forceCoeffs = [float(x) for x in forceCoeffs]
-                
-               
-               
-    dataFrameZ = pd.DataFrame(forceCoeffs, index = forceHeader,columns = ['cl'])
-    dataFrameX = pd.DataFrame(forceCoeffs, index = forceHeader,columns = ['cd'])
-    
-    dataFrameZ = dataFrameZ[dataFrameZ.index.str.contains("internal|patch|_x|_y") == False]   
-    dataFrameX = dataFrameX[dataFrameX.index.str.contains("internal|patch|_z|_y") == False]
-    
-    dataFrameZ["xCoords"] = xCoords
-    dataFrameX["xCoords"] = xCoords
-    
-    
-    dataFrameZ = dataFrameZ.set_index(['xCoords'])
-    dataFrameX = dataFrameX.set_index(['xCoords'])
-    dataFrameX.to_csv("%s/%s/%s_cd_development.csv" % (path,case,caseName))
-    dataFrameZ.to_csv("%s/%s/%s_cl_development.csv" % (path,case,caseName))
-    
-    
-    return dataFrameZ, dataFrameX
-    
-simulationArray = []
-lastTimeArray = []    
-for i in caseNames:
-    print("Checking for trial%s...\n" % (i))
-    findCase(i)
-    simulationArray = simulationArray + [simType]
-    lastTimeArray = lastTimeArray + [lastTime]
-    
-#check(simulationArray)
-
-
-allClBin = pd.DataFrame()
-allClBinMin = []
-allClBinMax = []
-
-allCdBin = pd.DataFrame()
-allCdBinMin = []
-allCdBinMax = []
-
-allxcoordBinMin = []
-allxcoordBinMax = []
-
-
-
-#plt.style.use('bmh')
-#clbinfig = plt.figure(figsize=(15, 10),layout='tight')
-clbinfig = plt.figure(figsize=(8, 5))
-#clbinfig.set_size_inches(10,4,forward=True)
-clbinax = clbinfig.add_subplot(111, frame_on=True)
-clbinax.set_title("Cl Development")
-
-
-cdbinfig = plt.figure(figsize=(8, 5))
-cdbinax = cdbinfig.add_subplot(111, frame_on=True)
-cdbinax.set_title("Cd Development")
-
-#plotting the bin data first
-for i in caseNames:
-    dataFrameZ,dataFrameX = importBinData(path,i)
-
-    allClBin[i+" - distance"] = dataFrameZ.index
-    if "half" in i:
-        allClBin[i] = dataFrameZ.cl.to_numpy()*2
-        clMin = dataFrameZ.cl.to_numpy().min()*2
-        clMax = dataFrameZ.cl.to_numpy().max()*2
-    else:
-        allClBin[i] = dataFrameZ.cl.to_numpy()
-        clMin = dataFrameZ.cl.to_numpy().min()
-        clMax = dataFrameZ.cl.to_numpy().max()
-    
-    allClBinMin.append(clMin)
-    allClBinMax.append(clMax)
-    
-    allCdBin[i+" - distance"] = dataFrameX.index
-    if "half" in i:
-        allCdBin[i] = dataFrameX.cd.to_numpy()*2
-        cdMin = dataFrameX.cd.to_numpy().min()*2
-        cdMax = dataFrameX.cd.to_numpy().max()*2
-    else:
-        allCdBin[i] = dataFrameX.cd.to_numpy()
-        cdMin = dataFrameX.cd.to_numpy().min()
-        cdMax = dataFrameX.cd.to_numpy().max()
-        
-    allCdBinMin.append(cdMin)
-    allCdBinMax.append(cdMax)
-        
-    xMin = dataFrameZ.index.to_numpy().min()
-    xMax = dataFrameZ.index.to_numpy().max()
-    allxcoordBinMin.append(xMin)
-    allxcoordBinMax.append(xMax)
-    
-    allCdBin.plot(x=i+" - distance",y=i,ax=cdbinax)
-    
-    allClBin.plot(x=i+" - distance",y=i,ax=clbinax)
-    
-
-#displaying the figures    
-count = 0    
-for i in caseNames:
-    ROI,SKIPIMAGE = getGeomImage(path,i)
-    #if there is no image found, skip this this part
-    if SKIPIMAGE == True:
-        continue 
-        
-    h,w,c = ROI.shape
-    r = h/w
-    
-    xMin = allxcoordBinMin[count]
-    xMax = allxcoordBinMax[count]
-    
-    clMax = allClBinMax[count]
-    clMin = allClBinMin[count]
-    allClMin = min(allClBinMin)
-    
-     
-    plotR = (xMax-xMin)/(clMax-clMin)
-    rFactor = r/plotR
-    clmaxy = (xMax-xMin)*r
-    
-    clbinax.imshow(ROI,origin='upper',extent = [xMin,xMax,allClMin,allClMin+(xMax-xMin)*r])
-    cdbinax.imshow(ROI,origin='upper',extent = [xMin,xMax,cdMin,cdMin+(xMax-xMin)*r])
-   
-    count += 1
-   
-   
-
-
-
-
-clbinax.margins(0,0)
-#clbinax.set_aspect(0.5)
-clbinMin = min(allClBinMin)
-clbinMax = max(allClBinMax)
-posBinMin = min(allxcoordBinMin)
-postBinMax = max(allxcoordBinMax)
-clbinax.set_xlim([posBinMin,postBinMax])
-
-clbinax.set_xlabel('Distance (m)')
-clbinax.set_ylabel('Cl')
-clbinax.legend(loc='upper right')
-clbinax.grid(visible=True,which='both',axis='both')
-clbinax.xaxis.set_minor_locator(AutoMinorLocator())
-clbinax.yaxis.set_minor_locator(AutoMinorLocator())
-clbinax.tick_params(which='both', width=2)
-clbinax.tick_params(which='major', length=7)
-clbinax.tick_params(which='minor', length=4, color='b')
-
-
-
-#cdbinax.autoscale()
-cdbinax.margins(0,0)
-cdbinMin = min(allCdBinMin)
-cdbinMax = max(allCdBinMax)
-posBinMin = min(allxcoordBinMin)
-postBinMax = max(allxcoordBinMax)
-cdbinax.set_xlim([posBinMin,postBinMax])
-
-cdbinax.set_xlabel('Distance (m)')
-cdbinax.set_ylabel('Cd')
-cdbinax.legend(loc='upper right')
-cdbinax.grid(visible=True,which='both',axis='both')
-cdbinax.xaxis.set_minor_locator(AutoMinorLocator())
-cdbinax.yaxis.set_minor_locator(AutoMinorLocator())
-cdbinax.tick_params(which='both', width=2)
-cdbinax.tick_params(which='major', length=7)
-cdbinax.tick_params(which='minor', length=4, color='b')
-
-
-plotList = [cdbinfig,clbinfig]
-plotNames = ['cd','cl']
-if save == True:
-    for figure,plotName in zip(plotList,plotNames):
-        figure.savefig("%s-development_%s.png" % (plotName,'_'.join(caseNames)),dpi=300,bbox_inches='tight')
-
-
-if not noShow == True:
-    plt.show()
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
+import sys
+import os
+import io
+import hashlib
+import threading
+import multiprocessing
+import argparse as argparse
+from itertools import repeat
+from bcParser_v1_0 import bcParser
+from campaignIndex import queryTrials
+
+#pandas, numpy, cv2 and matplotlib are imported where they are used so the command line
+#and importers that never plot do not pay for them
+params = {'mathtext.default': 'regular' }
+
+PLOT_NAMES = ['cd','cl']
+
+
+class BinPlotError(Exception):
+    pass
+
+
+#check if all the cases listed can be found can be found, and checking that it's type is the same
+
+def findCase(path,caseName,caseData=None):
+    #returns (simType,lastTime), taken from caseData (e.g. campaign index rows) when the trial is in it
+    if os.path.isdir("%s/%s" % (path,caseName)):
+        print("     Found trial%s..." % (caseName))
+        if caseData is not None and caseName in caseData:
+            simType = caseData[caseName]['simType']
+            lastTime = caseData[caseName]['lastTime']
+        else:
+            config = bcParser(path,caseName)
+            simType = config.simType
+            lastTime = config.lastTime
+        print("         Simulation Type: %s\n" % (simType))
+        return simType,lastTime
+
+    else:
+        raise BinPlotError("  Trial%s not found! Check your entry!\n" % (caseName))
+
+def check(lst):
+    # Use the repeat function to generate an iterator that returns the first element of the list repeated len(lst) times
+    repeated = list(repeat(lst[0], len(lst)))
+    # Compare the repeated list to the original list and return the result
+    if not repeated == lst:
+        raise BinPlotError("Simulation type not consistent! Exiting!")
+
+def getGeomImage(path,caseName,noImage=False):
+    imagePath = "%s/%s/postProcessing/images/Geom_Surface/%s_Geom_Surface_Left.png" % (path,caseName,caseName)
+    if not os.path.isfile(imagePath):
+        #sys.exit("     Cannot find geometry image for trial%s, exiting..." % (caseName))
+        print("     Cannot find geometry image for trial%s, skipping for this trial..." % (caseName))
+        SKIPIMAGE = True
+        ROI = []
+        return ROI, SKIPIMAGE
+    elif noImage == True:
+        print("     Not showing car geometry images...")
+        SKIPIMAGE = True
+        ROI = []
+        return ROI, SKIPIMAGE
+
+    else:
+        ROI = convertImage(imagePath,cacheDir=os.path.join(path,ROI_CACHE_DIR))
+        SKIPIMAGE = False
+        return ROI, SKIPIMAGE
+
+#### GEOMETRY ROI CACHE ####
+#cropped overlays are stored per trials directory under the sha1 of the source render, so every
+#trial and run using the same geometry image shares one crop. The in-process memo is keyed on
+#(mtime, size) so an unchanged image is not even re-hashed
+ROI_CACHE_DIR = '.binPlotCache'
+ROI_ALPHA = 70
+
+_roiMemo = {}
+_roiMemoLock = threading.Lock()
+
+def imageDigest(imagePath):
+    sha = hashlib.sha1()
+    with open(imagePath,'rb') as fp:
+        for block in iter(lambda: fp.read(1 << 20),b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+def _readRoiCache(cachePath):
+    import numpy as np
+    try:
+        with np.load(cachePath) as cached:
+            return cached['roi'],tuple(cached['bbox'])
+    except (OSError,ValueError,KeyError):
+        return None
+
+def _writeRoiCache(cachePath,ROI,bbox):
+    #written to a temp file and renamed so parallel runs never read half an array,
+    #read-only trees just go without a disk cache
+    import numpy as np
+    tmpPath = "%s.%d.tmp" % (cachePath,os.getpid())
+    try:
+        os.makedirs(os.path.dirname(cachePath),exist_ok=True)
+        with open(tmpPath,'wb') as fp:
+            np.savez(fp,roi=ROI,bbox=np.array(bbox))
+        os.replace(tmpPath,cachePath)
+    except OSError:
+        if os.path.exists(tmpPath):
+            os.remove(tmpPath)
+
+def cropGeometry(imagePath):
+    import cv2
+    import numpy as np
+    # Load image, convert to grayscale, Gaussian blur, Otsu's threshold
+    image = cv2.imread(imagePath)
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    blur = cv2.GaussianBlur(gray, (3,3), 0, dst=gray)
+    thresh = cv2.threshold(blur, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU, dst=blur)[1]
+
+    # Obtain bounding rectangle and extract ROI
+    x,y,w,h = cv2.boundingRect(thresh)
+
+    # ROI is filled straight from a view of the frame with the alpha channel added
+    ROI = np.empty((h,w,4), dtype=image.dtype)
+    ROI[:,:,:3] = image[y:y+h, x:x+w]
+    ROI[:,:,3] = ROI_ALPHA
+    return ROI,(x,y,w,h)
+
+def convertImage(imagePath,cacheDir=None):
+    fileStat = os.stat(imagePath)
+    memoKey = (os.path.realpath(imagePath),fileStat.st_mtime_ns,fileStat.st_size)
+    with _roiMemoLock:
+        memo = _roiMemo.get(memoKey)
+    if memo is not None:
+        return memo[0]
+
+    cachePath = None
+    cached = None
+    if cacheDir is not None:
+        cachePath = os.path.join(cacheDir,"roi_%s.npz" % (imageDigest(imagePath)))
+        cached = _readRoiCache(cachePath)
+    if cached is None:
+        cached = cropGeometry(imagePath)
+        if cachePath is not None:
+            _writeRoiCache(cachePath,*cached)
+
+    with _roiMemoLock:
+        _roiMemo[memoKey] = cached
+    return cached[0]
+
+
+def writeDevelopmentCsv(csvPath,dataFrame,sourceTime):
+    #rewritten only when missing, older than the bin forces it was made from, or made with other
+    #options (another average or time), an unchanged rerun leaves it alone
+    text = dataFrame.to_csv()
+    if os.path.isfile(csvPath) and os.path.getmtime(csvPath) >= sourceTime:
+        with open(csvPath,newline='') as fp:
+            if fp.read() == text:
+                return
+    tmpPath = "%s.%d.%d.tmp" % (csvPath,os.getpid(),threading.get_ident())
+    with open(tmpPath,'w',newline='') as fp:
+        fp.write(text)
+    os.replace(tmpPath,csvPath)
+
+def importBinData(path,caseName,lastTime,forwardAvg=None,atTime=None,csvDir=None):
+    import pandas as pd
+    from binForceReader import selectCoeffFile, historyRow, historyTime, forwardAverage
+
+    timeList = os.listdir("%s/%s/postProcessing/binForceCoeffs/" % (path,caseName))
+    rowTime = lastTime
+    if not lastTime in timeList:
+        lastTime = max(timeList)
+        rowTime = None
+        print("End time specified in controlDict does not match available times. Using lastest available time %s" % (lastTime))
+
+    if not os.path.isdir("%s/%s/postProcessing/binForceCoeffs/%s/" % (path,caseName,lastTime)):
+        raise BinPlotError("Bin forces export might not have been run successfully for trial %s, please check your log files!" % (caseName))
+
+    timePath = "%s/%s/postProcessing/binForceCoeffs/%s/" % (path,caseName,lastTime)
+    if len(os.listdir(timePath)) < 1:
+        raise BinPlotError("Bin forces export might not have been run successfully for trial %s, please check your log files!" % (caseName))
+
+    binCoeff = selectCoeffFile(timePath,lastTime)
+    if binCoeff is None:
+        raise BinPlotError("None of the coefficients files in trial %s have enough data!" % (caseName))
+
+    #every row, at the end time or any other, comes from the memory mapped history (see
+    #binForceReader.loadHistory) which is parsed once per change of the source
+    avgCoeffs = None
+    if forwardAvg is not None:
+        try:
+            xCoords,forceHeader,forceCoeffs,avgCoeffs,nAvg = forwardAverage(os.path.join(timePath,binCoeff),forwardAvg,atTime)
+        except (ValueError,KeyError) as error:
+            #a file with a header but no rows, or an --atTime before its first row
+            raise BinPlotError("Cannot average the bin forces of trial %s: %s" % (caseName,error))
+        if nAvg > 0:
+            print("     Forward averaged %d time steps from %g for trial%s" % (nAvg,forwardAvg,caseName))
+        else:
+            print("     No time steps after %g for trial%s, forward average equals the raw bin forces" % (forwardAvg,caseName))
+    else:
+        try:
+            if atTime is None:
+                xCoords,forceHeader,rowTime,forceCoeffs = historyRow(os.path.join(timePath,binCoeff),rowTime)
+            else:
+                xCoords,forceHeader,rowTime,forceCoeffs = historyRow(os.path.join(timePath,binCoeff),atTime,exact=False)
+                print("     Using bin forces at time %g for trial%s" % (rowTime,caseName))
+        except KeyError:
+            forceCoeffs = []
+    if len(forceCoeffs) < 1:
+        raise BinPlotError("Cannot find time %s in %s for trial %s!" % (lastTime if atTime is None else atTime,binCoeff,caseName))
+
+    dataFrameZ = pd.DataFrame({'cl':forceCoeffs}, index = forceHeader)
+    dataFrameX = pd.DataFrame({'cd':forceCoeffs}, index = forceHeader)
+    if avgCoeffs is not None:
+        dataFrameZ['clAvg'] = avgCoeffs
+        dataFrameX['cdAvg'] = avgCoeffs
+
+    dataFrameZ = dataFrameZ[dataFrameZ.index.str.contains("internal|patch|_x|_y") == False]
+    dataFrameX = dataFrameX[dataFrameX.index.str.contains("internal|patch|_z|_y") == False]
+
+    dataFrameZ["xCoords"] = xCoords
+    dataFrameX["xCoords"] = xCoords
+
+
+    dataFrameZ = dataFrameZ.set_index(['xCoords'])
+    dataFrameX = dataFrameX.set_index(['xCoords'])
+    if csvDir is not None:
+        sourceTime = historyTime(os.path.join(timePath,binCoeff))
+        writeDevelopmentCsv("%s/%s_cd_development.csv" % (csvDir,caseName),dataFrameX,sourceTime)
+        writeDevelopmentCsv("%s/%s_cl_development.csv" % (csvDir,caseName),dataFrameZ,sourceTime)
+
+
+    return dataFrameZ, dataFrameX
+
+
+def _newFigure(interactive):
+    #pyplot (and with it a display backend) is only loaded for plt.show(), saved figures are
+    #plain Figures drawn by Agg
+    if interactive:
+        import matplotlib.pyplot as plt
+        return plt.figure(figsize=(8, 5))
+    from matplotlib.figure import Figure
+    return Figure(figsize=(8, 5))
+
+def _styleAxis(ax,label,posBinMin,postBinMax):
+    from matplotlib.ticker import AutoMinorLocator
+    ax.margins(0,0)
+    ax.set_xlim([posBinMin,postBinMax])
+
+    ax.set_xlabel('Distance (m)')
+    ax.set_ylabel(label)
+    ax.legend(loc='upper right')
+    ax.grid(visible=True,which='both',axis='both')
+    ax.xaxis.set_minor_locator(AutoMinorLocator())
+    ax.yaxis.set_minor_locator(AutoMinorLocator())
+    ax.tick_params(which='both', width=2)
+    ax.tick_params(which='major', length=7)
+    ax.tick_params(which='minor', length=4, color='b')
+
+#dataframe (0 = cl frame, 1 = cd frame), column, title and axis label of each figure
+FIGURE_SPECS = {
+    'cd':(1,'cd',"Cd Development",'Cd'),
+    'cl':(0,'cl',"Cl Development",'Cl'),
+    'cdDelta':(1,'cd',"Cd Delta to trial%s",'\u0394Cd'),
+    'clDelta':(0,'cl',"Cl Delta to trial%s",'\u0394Cl'),
+}
+DELTA_PLOT_NAMES = ['cdDelta','clDelta']
+
+def _trialBins(caseNames,binData,frameIndex,column):
+    #bin x co-ords and symmetry corrected values of every trial
+    from binAlignment import symmetryFactors
+    factors = symmetryFactors(caseNames)
+    xs = [binData[i][frameIndex].index.to_numpy(dtype=float) for i in caseNames]
+    ys = [binData[i][frameIndex][column].to_numpy(dtype=float)*factor for i,factor in zip(caseNames,factors)]
+    return xs,ys
+
+def plotFigure(plotName,caseNames,binData,rois,forwardAvg=None,interactive=False):
+    #builds one development figure from already imported bin data and geometry ROIs
+    import matplotlib
+    import numpy as np
+    from binAlignment import unionGrid, alignBins
+    matplotlib.rcParams.update(params)
+    if plotName in DELTA_PLOT_NAMES:
+        return plotDeltaFigure(plotName,caseNames,binData,forwardAvg,interactive)
+    frameIndex,column,title,label = FIGURE_SPECS[plotName]
+
+    #all trials on one grid, each line is NaN outside its own bins
+    xs,ys = _trialBins(caseNames,binData,frameIndex,column)
+    grid = unionGrid(xs)
+    values = alignBins(xs,ys,grid)
+    xMins = np.array([x.min() for x in xs])
+    xMaxs = np.array([x.max() for x in xs])
+
+    #plt.style.use('bmh')
+    binfig = _newFigure(interactive)
+    binax = binfig.add_subplot(111, frame_on=True)
+    binax.set_title(title)
+
+    #plotting the bin data first
+    lines = binax.plot(grid,values.T,label=caseNames)
+    allMin = np.nanmin(values)
+
+    #forward averaged distribution drawn dashed over the raw end time bins
+    if forwardAvg is not None:
+        avgXs,avgYs = _trialBins(caseNames,binData,frameIndex,column+'Avg')
+        avgValues = alignBins(avgXs,avgYs,grid)
+        for i,line,avg in zip(caseNames,lines,avgValues):
+            binax.plot(grid,avg,'--',color=line.get_color(),label=i+" - avg")
+        allMin = min(allMin,np.nanmin(avgValues))
+
+    #displaying the figures
+    for count,i in enumerate(caseNames):
+        ROI = rois.get(i)
+        #if there is no image found, skip this this part
+        if ROI is None:
+            continue
+
+        h,w,c = ROI.shape
+        r = h/w
+
+        xMin = xMins[count]
+        xMax = xMaxs[count]
+
+        binax.imshow(ROI,origin='upper',extent = [xMin,xMax,allMin,allMin+(xMax-xMin)*r])
+
+    _styleAxis(binax,label,xMins.min(),xMaxs.max())
+    return binfig
+
+def plotDeltaFigure(plotName,caseNames,binData,forwardAvg=None,interactive=False):
+    #cumulative (top) and per bin (bottom) deltas of every trial against the first one,
+    #on a uniform grid so trials with different bins line up
+    from binAlignment import commonGrid, alignBins, deltaToReference
+    frameIndex,column,title,label = FIGURE_SPECS[plotName]
+    if forwardAvg is not None:
+        column += 'Avg'
+    xs,ys = _trialBins(caseNames,binData,frameIndex,column)
+    grid = commonGrid(xs)
+    cumulative,perBin = deltaToReference(alignBins(xs,ys,grid,extend=True))
+
+    deltafig = _newFigure(interactive)
+    cumulativeAx = deltafig.add_subplot(211, frame_on=True)
+    perBinAx = deltafig.add_subplot(212, frame_on=True, sharex=cumulativeAx)
+    cumulativeAx.set_title(title % (caseNames[0]))
+
+    labels = ["%s - %s" % (i,caseNames[0]) for i in caseNames[1:]]
+    cumulativeAx.plot(grid,cumulative[1:].T,label=labels)
+    perBinAx.plot(grid,perBin[1:].T,label=labels,drawstyle='steps-pre')
+    for ax in (cumulativeAx,perBinAx):
+        ax.axhline(0.0,color='k',linewidth=1)
+
+    _styleAxis(cumulativeAx,label,grid[0],grid[-1])
+    _styleAxis(perBinAx,label+' per bin',grid[0],grid[-1])
+    cumulativeAx.set_xlabel('')
+    return deltafig
+
+def renderFigure(plotName,caseNames,binData,rois,forwardAvg=None,savePath=None):
+    #worker side of the parallel rendering, draws one figure with Agg and returns it as PNG bytes
+    figure = plotFigure(plotName,caseNames,binData,rois,forwardAvg)
+    buffer = io.BytesIO()
+    figure.savefig(buffer,format='png',dpi=300,bbox_inches='tight')
+    if savePath is not None:
+        with open(savePath,'wb') as fp:
+            fp.write(buffer.getvalue())
+    return buffer.getvalue()
+
+def plotFileName(plotName,caseNames,atTime=None):
+    if atTime is None:
+        return "%s-development_%s.png" % (plotName,'_'.join(caseNames))
+    return "%s-development_%s_t%g.png" % (plotName,'_'.join(caseNames),atTime)
+
+def _loadTrial(path,caseName,lastTime,forwardAvg,atTime,csvDir,noImage):
+    binData = importBinData(path,caseName,lastTime,forwardAvg,atTime,csvDir)
+    ROI,SKIPIMAGE = getGeomImage(path,caseName,noImage)
+    return binData,(None if SKIPIMAGE else ROI)
+
+def plotBinDevelopment(path,caseNames,saveDir=None,forwardAvg=None,atTime=None,noImage=False,
+                       caseData=None,buffers=False,show=False,workers=None,deltas=False):
+    """ Plots the Cl and Cd bin development of caseNames, the first trial being the reference
+        - saveDir: writes <cd|cl>-development_<trials>.png there when given
+        - deltas: also plots cdDelta/clDelta, the cumulative and per bin deltas to the reference
+        - caseData: trial -> {'simType','lastTime'} rows that save re-parsing the case files
+        - buffers: returns {plotName: PNG BytesIO buffer}, otherwise the saved paths
+        - show: draws with pyplot in this process and returns the figures after plt.show()
+        Trials are read concurrently and each figure is rendered in its own worker process, workers
+        caps both pools.
+        Raises BinPlotError when a trial or its bin force data cannot be found.
+    """
+    from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+    lastTimes = {}
+    for i in caseNames:
+        print("Checking for trial%s...\n" % (i))
+        simType,lastTimes[i] = findCase(path,i,caseData)
+
+    #development csvs go in the reference trial, as they always have
+    csvDir = os.path.join(path,caseNames[0])
+    binData = {}
+    rois = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {i:executor.submit(_loadTrial,path,i,lastTimes[i],forwardAvg,atTime,csvDir,noImage) for i in caseNames}
+        for i in caseNames:
+            binData[i],ROI = futures[i].result()
+            if ROI is not None:
+                rois[i] = ROI
+
+    plotNames = list(PLOT_NAMES)
+    if deltas and len(caseNames) > 1:
+        plotNames += DELTA_PLOT_NAMES
+    elif deltas:
+        print("     Delta plots need at least two trials, skipping...")
+
+    savePaths = {}
+    for plotName in plotNames:
+        savePaths[plotName] = None if saveDir is None else os.path.join(saveDir,plotFileName(plotName,caseNames,atTime))
+
+    if show:
+        import matplotlib.pyplot as plt
+        figures = {}
+        for plotName in plotNames:
+            figures[plotName] = plotFigure(plotName,caseNames,binData,rois,forwardAvg,interactive=True)
+            if savePaths[plotName] is not None:
+                figures[plotName].savefig(savePaths[plotName],dpi=300,bbox_inches='tight')
+        plt.show()
+        return figures
+
+    results = {}
+    #started from a thread of the report's build graph, so the workers come from a fork server
+    with ProcessPoolExecutor(max_workers=len(plotNames) if workers is None else min(workers,len(plotNames)),
+                             mp_context=multiprocessing.get_context('forkserver')) as executor:
+        futures = {plotName:executor.submit(renderFigure,plotName,caseNames,binData,rois,forwardAvg,savePaths[plotName])
+                   for plotName in plotNames}
+        for plotName in plotNames:
+            pngBytes = futures[plotName].result()
+            results[plotName] = io.BytesIO(pngBytes) if buffers else savePaths[plotName]
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='Force Development Plotter',description='Will plot force development and forward average values if sufficient iterations available.\
+                                                                        If there are insufficient time steps for averaging, the forward average line will be equal\
+                                                                        to the raw force integral line.')
+    parser.add_argument("-t","--caseNames", metavar='trial',nargs='+',
+                        help='Additional trials to be plotted, if doing current trial, leave blank!')
+
+    parser.add_argument('-a',"--forwardAvg", metavar='avgStart', type=float,
+                        help='Time to start forward averaging')
+
+    parser.add_argument('-T',"--atTime", metavar='time', type=float,
+                        help='Plots the bins at this time (or the last row before it) instead of the end time.')
+
+    parser.add_argument("-s","--save", action="store_true",
+                        help='Saves all plots (regardless if -p options are used) to current trial.')
+
+    parser.add_argument("-n","--noShow", action="store_true",
+                        help='Does not show plots.')
+
+    parser.add_argument("-i","--noImage", action="store_true",
+                        help='Does not show geometry image.')
+
+    parser.add_argument("-d","--deltas", action="store_true",
+                        help='Also plots the cumulative and per bin Cd/Cl deltas of each trial to the current trial.')
+
+    parser.add_argument("-x","--index", action="store_true",
+                        help='Reads trial end times and simulation types from the campaign index (see campaignIndex.py).')
+
+    args = parser.parse_args(argv)
+
+    path = os.path.split(os.getcwd())[0]
+    case = os.path.split(os.getcwd())[1]
+
+    if args.caseNames is None:
+        caseNames = [case]
+    else:
+        caseNames = [case] + args.caseNames
+
+    if args.noShow:
+        #headless runs never need a display, even if something downstream pulls in pyplot
+        import matplotlib
+        matplotlib.use('Agg')
+
+    caseData = queryTrials(path,caseNames) if args.index else None
+    saveDir = os.getcwd() if args.save else None
+
+    try:
+        plotBinDevelopment(path,caseNames,saveDir=saveDir,forwardAvg=args.forwardAvg,atTime=args.atTime,
+                           noImage=args.noImage,caseData=caseData,show=not args.noShow,
+                           deltas=args.deltas)
+    except BinPlotError as error:
+        sys.exit(str(error))
+
+
+if __name__ == '__main__':
+    main()
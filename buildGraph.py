@@ -0,0 +1,138 @@
+import os
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+
+#### BUILD GRAPH ####
+#the files a report is made from, modelled the way make models a build. Every node declares the
+#files it reads and the files it writes and is rebuilt only when one of its outputs is missing or
+#older than one of its inputs. Nodes run once per build, in dependency order, and nodes that do not
+#depend on each other run side by side
+class BuildError(Exception):
+    pass
+
+class Node:
+    """ One step of the build
+        - action(results) makes the outputs and returns the node's result, results holds the results
+          of the nodes it comes after
+        - reuse(results) gives the result of an up to date node, None when omitted
+        - a node without outputs is always run, a node without an action is a source whose outputs
+          are only checked for
+        - the outputs of the nodes it comes after count as its inputs
+    """
+
+    def __init__(self,name,action=None,inputs=(),outputs=(),after=(),reuse=None):
+        self.name = name
+        self.action = action
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.after = list(after)
+        self.reuse = reuse
+
+def _mtime(filePath):
+    try:
+        return os.stat(filePath).st_mtime_ns
+    except OSError:
+        return None
+
+class BuildGraph:
+    """ Nodes by name and the state of the last run
+        - run() brings the targets and everything they come after up to date
+        - rebuilt, skipped and missing list the node names the run handled each way
+    """
+
+    def __init__(self):
+        self.nodes = {}
+        self.results = {}
+        self.rebuilt = []
+        self.skipped = []
+        self.missing = []
+
+    def add(self,name,action=None,inputs=(),outputs=(),after=(),reuse=None):
+        if name in self.nodes:
+            raise BuildError("node %s is defined twice" % (name))
+        self.nodes[name] = Node(name,action,inputs,outputs,after,reuse)
+        return self.nodes[name]
+
+    def required(self,targets=None):
+        #the targets and every node they come after, each one once
+        targets = list(self.nodes) if targets is None else list(targets)
+        required = []
+        def visit(name,chain):
+            if name in chain:
+                raise BuildError("dependency cycle: %s" % (' -> '.join(chain + [name])))
+            if name in required:
+                return
+            if name not in self.nodes:
+                raise BuildError("unknown node %s" % (name))
+            for before in self.nodes[name].after:
+                visit(before,chain + [name])
+            required.append(name)
+        for name in targets:
+            visit(name,[])
+        return required
+
+    def isStale(self,node):
+        #make's rule: a missing output, or an output older than the newest input
+        if not node.outputs:
+            return True
+        outputTimes = [_mtime(output) for output in node.outputs]
+        if None in outputTimes:
+            return True
+        inputs = node.inputs + [output for before in node.after for output in self.nodes[before].outputs]
+        inputTimes = [inputTime for inputTime in map(_mtime,inputs) if inputTime is not None]
+        return bool(inputTimes) and max(inputTimes) > min(outputTimes)
+
+    def run(self,targets=None,force=False,workers=None):
+        """ Builds the stale nodes among the targets, returns {name: result}
+            - force rebuilds every node that has an action
+            - a node whose action raises lets the running nodes finish, nothing after it is started
+              and a BuildError is raised for it
+        """
+        pending = self.required(targets)
+        self.results = {}
+        self.rebuilt = []
+        self.skipped = []
+        self.missing = []
+        running = {}
+        error = None
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            while True:
+                #sources and up to date nodes resolve here and can make further nodes ready at once
+                ready = self._ready(pending) if error is None else []
+                while ready:
+                    for name in ready:
+                        pending.remove(name)
+                        self._start(self.nodes[name],force,executor,running)
+                    ready = self._ready(pending)
+                if not running:
+                    break
+                done,notDone = wait(running,return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        self.results[name] = future.result()
+                    except Exception as nodeError:
+                        if error is None:
+                            error = BuildError("%s failed: %s" % (name,nodeError))
+                            error.__cause__ = nodeError
+                        continue
+                    self.rebuilt.append(name)
+        if error is not None:
+            raise error
+        return self.results
+
+    def _ready(self,pending):
+        return [name for name in pending if all(before in self.results for before in self.nodes[name].after)]
+
+    def _start(self,node,force,executor,running):
+        results = {before:self.results[before] for before in node.after}
+        if node.action is None:
+            #a source node, nothing here can make what is missing
+            if any(_mtime(output) is None for output in node.outputs):
+                self.missing.append(node.name)
+            self.results[node.name] = None
+        elif force or self.isStale(node):
+            running[executor.submit(node.action,results)] = node.name
+        else:
+            self.skipped.append(node.name)
+            self.results[node.name] = None if node.reuse is None else node.reuse(results)
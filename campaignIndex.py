@@ -0,0 +1,144 @@
+import os
+import json
+import sqlite3
+import argparse as argparse
+from contextlib import contextmanager
+from bcParser_v1_0 import bcParser, caseSymmetry, caseStamp
+from batchSummary import isTrial
+
+INDEX_FILE = 'campaignIndex.sqlite'
+#columns of trial<name>_AVG_all_coeff.csv holding CdA, ClA, ClfA, ClrA and the CdA/ClA 0.95 CIs
+AVG_COLUMNS = (1,2,3,4,7,8)
+BC_FIELDS = ['simType','inletMag','turbModel','wheelRotation','yaw','symmetry','lastTime']
+COEFF_FIELDS = ['cda','cla','clfa','clra','ciCda','ciCla']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS trials (
+    trial TEXT PRIMARY KEY,
+    simType TEXT,
+    inletMag TEXT,
+    turbModel TEXT,
+    wheelRotation TEXT,
+    yaw TEXT,
+    symmetry TEXT,
+    lastTime TEXT,
+    bcStamp TEXT
+);
+CREATE TABLE IF NOT EXISTS coeffs (
+    trial TEXT PRIMARY KEY,
+    cda REAL,
+    cla REAL,
+    clfa REAL,
+    clra REAL,
+    ciCda REAL,
+    ciCla REAL,
+    avgStamp TEXT
+);
+"""
+
+
+def indexPath(path):
+    return os.path.join(path,INDEX_FILE)
+
+@contextmanager
+def openIndex(path):
+    #commits on success and always closes, the timeout lets concurrent writers wait their turn
+    connection = sqlite3.connect(indexPath(path),timeout=30)
+    try:
+        connection.executescript(SCHEMA)
+        with connection:
+            yield connection
+    finally:
+        connection.close()
+
+def avgFilePath(path,trial):
+    return os.path.join(path,trial,"trial%s_AVG_all_coeff.csv" % (trial))
+
+def readAverages(avgPath):
+    import numpy as np
+    return np.loadtxt(avgPath,dtype='float',comments='#',delimiter=",",skiprows=1,usecols=AVG_COLUMNS,ndmin=1)
+
+def _fileStamp(filePath):
+    fileStat = os.stat(filePath)
+    return json.dumps([fileStat.st_mtime_ns,fileStat.st_size])
+
+def _storedStamps(connection,table,column):
+    return dict(connection.execute("SELECT trial,%s FROM %s" % (column,table)).fetchall())
+
+def listTrials(path):
+    return sorted(entry.name for entry in os.scandir(path) if entry.is_dir() and isTrial(entry.path))
+
+def updateIndex(path,trials=None):
+    #refreshes only the rows whose case files or averages changed since the last update
+    if trials is None:
+        trials = listTrials(path)
+    updated = []
+    with openIndex(path) as connection:
+        bcStamps = _storedStamps(connection,'trials','bcStamp')
+        avgStamps = _storedStamps(connection,'coeffs','avgStamp')
+        for trial in trials:
+            #bcParser only re-reads the case files when they or the files they include changed
+            try:
+                config = bcParser(path,trial)
+                bcStamp = json.dumps(caseStamp(path,trial,config.includes),sort_keys=True)
+            except OSError:
+                print("\tCannot find the case files of %s, skipping..." % (trial))
+                continue
+            if bcStamps.get(trial) != bcStamp:
+                values = [str(value) for value in [config.simType,config.inletMag,config.turbModel,config.wheelRotation,
+                                                   config.yaw,caseSymmetry(trial),config.lastTime]]
+                connection.execute("INSERT OR REPLACE INTO trials VALUES (?,?,?,?,?,?,?,?,?)",[trial] + values + [bcStamp])
+                updated.append(trial)
+
+            avgPath = avgFilePath(path,trial)
+            if not os.path.isfile(avgPath):
+                connection.execute("DELETE FROM coeffs WHERE trial = ?",[trial])
+                continue
+            avgStamp = _fileStamp(avgPath)
+            if avgStamps.get(trial) != avgStamp:
+                averages = [float(value) for value in readAverages(avgPath)]
+                connection.execute("INSERT OR REPLACE INTO coeffs VALUES (?,?,?,?,?,?,?,?)",[trial] + averages + [avgStamp])
+                if trial not in updated:
+                    updated.append(trial)
+    return updated
+
+def _query(path,table,fields,trials):
+    #rows for the requested trials only, trials that were never indexed are left out
+    if not os.path.isfile(indexPath(path)):
+        return {}
+    with openIndex(path) as connection:
+        placeholders = ','.join('?' * len(trials))
+        rows = connection.execute("SELECT trial,%s FROM %s WHERE trial IN (%s)" % (','.join(fields),table,placeholders),list(trials))
+        return {row[0]:dict(zip(fields,row[1:])) for row in rows}
+
+def queryTrials(path,trials):
+    return _query(path,'trials',BC_FIELDS,trials)
+
+def queryCoeffs(path,trials):
+    import numpy as np
+    return {trial:np.array([row[field] for field in COEFF_FIELDS]) for trial,row in _query(path,'coeffs',COEFF_FIELDS,trials).items()}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog='Campaign Index',description='Indexes trial boundary conditions and averaged coefficients\
+                                                                    in a SQLite file beside the trials.')
+    parser.add_argument("path", nargs='?', default=os.path.split(os.getcwd())[0],
+                        help='Directory holding the trials, defaults to the parent of the current trial.')
+    parser.add_argument("-t","--caseNames", metavar='trial',nargs='+',
+                        help='Only update these trials, defaults to every trial in the directory.')
+    parser.add_argument("-p","--print", action="store_true",
+                        help='Prints the indexed trials after updating.')
+    args = parser.parse_args()
+
+    path = os.path.abspath(args.path)
+    updated = updateIndex(path,args.caseNames)
+    print("Updated %d trials in %s" % (len(updated),indexPath(path)))
+    if args.print:
+        trials = args.caseNames or listTrials(path)
+        bcRows = queryTrials(path,trials)
+        coeffRows = queryCoeffs(path,trials)
+        for trial in trials:
+            row = bcRows.get(trial,{})
+            print("\t%s: %s" % (trial,' | '.join(str(row.get(field)) for field in BC_FIELDS)))
+            if trial in coeffRows:
+                print("\t\t%s" % (' '.join("%0.3f" % (value) for value in coeffRows[trial])))
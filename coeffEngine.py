@@ -0,0 +1,152 @@
+import os
+import sys
+import csv
+import argparse as argparse
+from concurrent.futures import ThreadPoolExecutor
+from campaignIndex import avgFilePath, readAverages, queryCoeffs, listTrials
+
+
+#### COEFFICIENT ENGINE ####
+#the averaged coefficients of any number of trials held as one (nTrials, 6) array with the columns
+#CdA, ClA, ClfA, ClrA and the 0.95 CIs of CdA and ClA. Every quantity in the result tables is
+#computed on the whole array at once
+CDA,CLA,CLFA,CLRA,CI_CDA,CI_CLA = range(6)
+COEFF_NAMES = ['CdA','ClA','ClfA','ClrA']
+RESULT_LABELS = ['Trial','CdA','ClA','ClfA','ClrA','0.95 CI. - CdA','0.95 CI. - ClA','% Front']
+DELTA_LABELS = ['Trial','deltaCdA','deltaClA','deltaClfA','deltaClrA','0.95 CI. - deltaCdA','0.95 CI. - deltaClA','delta % Front']
+
+
+def _readTrial(avgPath):
+    try:
+        return readAverages(avgPath)
+    except (OSError,ValueError):
+        return None
+
+def loadCoeffs(path,trials,index=False,workers=None):
+    """ Averages of trials as an (nTrials, 6) array and a boolean mask of the trials that had any
+        - with index the campaign index is asked first, the remaining CSVs are read in a thread pool
+        - trials without averages are rows of zeros, as the report tables have always shown them
+    """
+    import numpy as np
+    values = np.zeros((len(trials),6))
+    found = np.zeros(len(trials),dtype=bool)
+    indexed = queryCoeffs(path,trials) if index else {}
+    for n,trial in enumerate(trials):
+        if trial in indexed:
+            values[n] = indexed[trial]
+            found[n] = True
+    unread = [n for n in range(len(trials)) if not found[n]]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        averages = executor.map(_readTrial,[avgFilePath(path,trials[n]) for n in unread])
+        for n,average in zip(unread,averages):
+            if average is not None and average.shape == (6,):
+                values[n] = average
+                found[n] = True
+    return values,found
+
+class CoeffTable:
+    """ Averaged coefficients of trials and the quantities derived from them
+        - values is the (nTrials, 6) array loadCoeffs returns, rows in the order of trials
+        - a reference is a trial name or a row number, the deltas of every trial are taken against it
+    """
+
+    def __init__(self,trials,values):
+        import numpy as np
+        self.trials = list(trials)
+        self.values = np.asarray(values,dtype=float).reshape(len(self.trials),6)
+
+    def row(self,reference):
+        return self.trials.index(reference) if isinstance(reference,str) else int(reference)
+
+    @property
+    def coeffs(self):
+        return self.values[:,:CI_CDA]
+
+    @property
+    def ci(self):
+        return self.values[:,CI_CDA:]
+
+    @property
+    def percentFront(self):
+        import numpy as np
+        #trials without averages are 0/0, shown as nan
+        with np.errstate(divide='ignore',invalid='ignore'):
+            return 100*self.values[:,CLFA]/self.values[:,CLA]
+
+    def deltas(self,reference=0):
+        """ Deltas of every trial to the reference, as (deltaCoeffs, deltaCi, deltaPercentFront)
+            - deltaCi is (nTrials, 2), the 0.95 CIs of the CdA and ClA deltas, sqrt(ci^2 + ciRef^2)
+            - the reference's own row is zeros, CIs included
+        """
+        import numpy as np
+        n = self.row(reference)
+        deltaCoeffs = self.coeffs - self.coeffs[n]
+        deltaCi = np.sqrt(self.ci**2 + self.ci[n]**2)
+        deltaCi[n] = 0
+        deltaPercentFront = self.percentFront - self.percentFront[n]
+        return deltaCoeffs,deltaCi,deltaPercentFront
+
+    def resultColumns(self):
+        #one column of strings per trial, in the order of RESULT_LABELS
+        import numpy as np
+        block = np.column_stack([np.array(self.trials,dtype=str),np.char.mod("%0.3f",self.values),
+                                 np.char.mod("%0.1f",self.percentFront)])
+        return block.tolist()
+
+    def deltaColumns(self,reference=0):
+        #one column of strings per trial other than the reference, in the order of DELTA_LABELS
+        import numpy as np
+        deltaCoeffs,deltaCi,deltaPercentFront = self.deltas(reference)
+        others = np.arange(len(self.trials)) != self.row(reference)
+        block = np.column_stack([np.array(self.trials,dtype=str),np.char.mod("%0.3f",deltaCoeffs),
+                                 np.char.mod("%0.3f",deltaCi),np.char.mod("%0.1f",deltaPercentFront)])
+        return block[others].tolist()
+
+    def csvRows(self,reference=None):
+        """ Header and one row per trial with the averages and % front, and the deltas to reference when given
+            - full precision, the tables round for display only
+        """
+        header = ['Trial'] + COEFF_NAMES + ['ciCdA','ciClA','percentFront']
+        rows = [[trial] + list(values) + [percentFront] for trial,values,percentFront in
+                zip(self.trials,self.values.tolist(),self.percentFront.tolist())]
+        if reference is not None:
+            header += ['delta%s' % (name) for name in COEFF_NAMES] + ['ciDeltaCdA','ciDeltaClA','deltaPercentFront']
+            deltaCoeffs,deltaCi,deltaPercentFront = self.deltas(reference)
+            for row,coeffs,ci,percentFront in zip(rows,deltaCoeffs.tolist(),deltaCi.tolist(),deltaPercentFront.tolist()):
+                row.extend(coeffs + ci + [percentFront])
+        return [header] + rows
+
+    def writeCsv(self,filePath,reference=None):
+        with open(filePath,'w',newline='') as fp:
+            csv.writer(fp).writerows(self.csvRows(reference))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog='Coefficient Engine',description='Tabulates the averaged coefficients of a set of trials,\
+                                                                    with their deltas and propagated CIs, as CSV.')
+    parser.add_argument("path", nargs='?', default=os.path.split(os.getcwd())[0],
+                        help='Directory holding the trials, defaults to the parent of the current trial.')
+    parser.add_argument("-t","--caseNames", metavar='trial',nargs='+',
+                        help='Trials to tabulate, defaults to every trial in the directory.')
+    parser.add_argument("-r","--reference", metavar='trial',
+                        help='Adds the deltas to this trial and their CIs.')
+    parser.add_argument("-o","--output", default=None,
+                        help='CSV file to write, defaults to standard output.')
+    parser.add_argument("-x","--index", action="store_true",
+                        help='Reads the averages from the campaign index (see campaignIndex.py) where it has them.')
+    args = parser.parse_args()
+
+    path = os.path.abspath(args.path)
+    trials = args.caseNames or listTrials(path)
+    if args.reference is not None and args.reference not in trials:
+        trials = [args.reference] + trials
+    values,found = loadCoeffs(path,trials,args.index)
+    missing = [trial for trial,hasAverages in zip(trials,found) if not hasAverages]
+    if missing:
+        print("No averages for: %s" % (' '.join(missing)),file=sys.stderr)
+    table = CoeffTable(trials,values)
+    if args.output is None:
+        csv.writer(sys.stdout).writerows(table.csvRows(args.reference))
+    else:
+        table.writeCsv(args.output,args.reference)
+        print("Wrote %d trials to %s" % (len(trials),args.output))
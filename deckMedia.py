@@ -0,0 +1,130 @@
+import os
+import hashlib
+import tempfile
+from PIL import Image as PIL_Image
+from pptx.opc.constants import RELATIONSHIP_TYPE as RT
+from pptx.parts.image import Image, ImagePart
+from mediaCache import fileDigest, saveHashIndex
+
+
+def headerImage(filePath,filename=None):
+    #a python-pptx Image described by the file's header alone, the pixel data is never read
+    image = Image(b'',filename)
+    with PIL_Image.open(filePath) as pilImage:
+        image.__dict__['_pil_props'] = (pilImage.format,pilImage.size,pilImage.info.get('dpi'))
+    return image
+
+class FileImagePart(ImagePart):
+    """ An image part that keeps the path of its image instead of its bytes
+        - the file is read when the package is written, one part at a time, so the memory a deck
+          holds does not grow with the number of images on its slides
+        - the file must stay in place until the deck is saved
+    """
+
+    def __init__(self,partname,content_type,package,filePath,digest,image):
+        ImagePart.__init__(self,partname,content_type,package,None,image.filename)
+        self.filePath = filePath
+        self.digest = digest
+        self.header = image
+
+    @classmethod
+    def fromFile(cls,package,filePath,digest,filename=None):
+        image = headerImage(filePath,filename)
+        return cls(package.next_image_partname(image.ext),image.content_type,package,filePath,digest,image)
+
+    @property
+    def _blob(self):
+        with open(self.filePath,'rb') as fp:
+            return fp.read()
+
+    @_blob.setter
+    def _blob(self,blob):
+        #the base classes store the blob they are given, this part always reads its file
+        pass
+
+    @property
+    def sha1(self):
+        return self.digest
+
+    @property
+    def _dpi(self):
+        return self.header.dpi
+
+    @property
+    def _px_size(self):
+        return self.header.size
+
+class DeckMedia:
+    """ One image part per distinct image content in a deck
+        - add_picture hashes and looks up every image against every part already in the package,
+          here the parts are kept in a sha1 map and images are hashed at most once per file version
+        - a path inside the media cache is already named by its content and is never re-hashed
+        - parts only reference their files, in-memory images are spooled to a temp directory that
+          close() removes once the deck is saved
+        - digests of newly hashed sources are added to the media cache's hash index on close()
+    """
+
+    def __init__(self,prs,cacheDir=None,hashIndex=None):
+        self.prs = prs
+        self.cacheDir = None if cacheDir is None else os.path.realpath(cacheDir)
+        self.hashIndex = hashIndex
+        self._parts = {}
+        self._pathDigests = {}
+        self._spool = None
+        self._newDigests = False
+
+    def digest(self,image):
+        if not isinstance(image,str):
+            image.seek(0)
+            return hashlib.sha1(image.read()).hexdigest()
+        realPath = os.path.realpath(image)
+        if realPath not in self._pathDigests:
+            if self.cacheDir is not None and os.path.dirname(realPath) == self.cacheDir:
+                self._pathDigests[realPath] = os.path.basename(realPath)
+            else:
+                known = None if self.hashIndex is None else self.hashIndex.get(realPath)
+                self._pathDigests[realPath] = fileDigest(realPath,self.hashIndex)
+                self._newDigests = self._newDigests or (self.hashIndex is not None and self.hashIndex.get(realPath) != known)
+        return self._pathDigests[realPath]
+
+    def imagePart(self,image):
+        key = self.digest(image)
+        imagePart = self._parts.get(key)
+        if imagePart is None:
+            if isinstance(image,str):
+                imagePart = FileImagePart.fromFile(self.prs.part.package,image,key,os.path.basename(image))
+            else:
+                #like add_picture, an image without a file is described by a generic name
+                imagePart = FileImagePart.fromFile(self.prs.part.package,self.spool(image,key),key)
+            self._parts[key] = imagePart
+        return imagePart
+
+    def spool(self,stream,key):
+        #writes an in-memory image to the spool directory, named by its content
+        if self._spool is None:
+            self._spool = tempfile.TemporaryDirectory(prefix='deckMedia-')
+        filePath = os.path.join(self._spool.name,key)
+        stream.seek(0)
+        with open(filePath,'wb') as fp:
+            fp.write(stream.read())
+        return filePath
+
+    def addPicture(self,slide,image,left,top,width=None,height=None):
+        #same as slide.shapes.add_picture, but identical images share one part in the package
+        imagePart = self.imagePart(image)
+        rId = slide.part.relate_to(imagePart,RT.IMAGE)
+        shapes = slide.shapes
+        pic = shapes._add_pic_from_image_part(imagePart,rId,left,top,width,height)
+        shapes._recalculate_extents()
+        return shapes._shape_factory(pic)
+
+    def close(self):
+        if self._newDigests and self.cacheDir is not None:
+            saveHashIndex(self.cacheDir,self.hashIndex)
+            self._newDigests = False
+        if self._spool is not None:
+            self._spool.cleanup()
+            self._spool = None
+
+    def __len__(self):
+        return len(self._parts)
@@ -0,0 +1,323 @@
+import os
+import re
+import mmap
+
+
+#tokens of an OpenFOAM dictionary, whitespace and comments are matched so they can be skipped
+_TOKEN = re.compile(rb'''
+      (?P<ws>\s+)
+    | (?P<comment>//[^\n]*|/\*.*?\*/)
+    | (?P<code>\#\{.*?\#\})
+    | (?P<string>"(?:[^"\\]|\\.)*")
+    | (?P<punct>[{}()\[\];])
+    | (?P<directive>\#[A-Za-z]+)
+    | (?P<word>\$\{[^{}\s;]*\}|[^\s{}()\[\];"/]+(?:/(?![/*])[^\s{}()\[\];"/]*)*)
+    | (?P<other>.)
+''', re.X | re.S)
+
+#only the characters that can change the brace depth, used to skip over sub-dictionaries
+_BLOCK = re.compile(rb'[{}"]|//|/\*|\#\{', re.S)
+
+
+def tokenize(buf,pos=0,end=None):
+    #yields (kind,text,start,stop) for every meaningful token between pos and end
+    if end is None:
+        end = len(buf)
+    while pos < end:
+        match = _TOKEN.match(buf,pos,end)
+        kind = match.lastgroup
+        pos = match.end()
+        if kind in ('ws','comment'):
+            continue
+        yield kind,match.group(),match.start(),pos
+
+
+def _skipBlock(buf,pos,end):
+    #pos is just after an opening brace, returns the position just after its matching close
+    depth = 1
+    while depth > 0:
+        match = _BLOCK.search(buf,pos,end)
+        if match is None:
+            raise ValueError("Unterminated { block in dictionary")
+        token = match.group()
+        if token == b'{':
+            depth += 1
+            pos = match.end()
+        elif token == b'}':
+            depth -= 1
+            pos = match.end()
+        else:
+            #strings and comments may contain braces, let the tokenizer step over them
+            pos = _TOKEN.match(buf,match.start(),end).end()
+    return pos
+
+
+def _text(token):
+    text = token.decode('utf-8','replace')
+    if text.startswith('"') and text.endswith('"'):
+        text = text[1:-1]
+    return text
+
+
+def _macroName(token):
+    #$name or ${name}, scoped macros ($:a.b, $../name) are not followed
+    name = _text(token)[1:]
+    if name.startswith('{') and name.endswith('}'):
+        name = name[1:-1]
+    if not name or any(char in name for char in ':./$'):
+        return None
+    return name
+
+
+class UnresolvedValue(ValueError):
+    #a value made by #calc or #{ #} code, or a $macro that names nothing, cannot be read without OpenFOAM
+    pass
+
+
+def parseValue(tokens):
+    #turns the tokens of an entry value into a string, or nested lists for ( ) and [ ] groups
+    stack = [[]]
+    for kind,token in tokens:
+        if kind == 'punct' and token in (b'(',b'['):
+            stack.append([])
+        elif kind == 'punct' and token in (b')',b']'):
+            group = stack.pop()
+            stack[-1].append(group)
+        else:
+            stack[-1].append(_text(token))
+    value = stack[0]
+    if len(value) == 1:
+        return value[0]
+    return value
+
+
+class FoamDict:
+    """ Lazily indexed view of an OpenFOAM dictionary file
+        - the file is memory mapped and only tokenized up to the entry that was asked for
+        - sub-dictionaries are returned as FoamDicts over the same map and are indexed on demand
+        - top level #include files are indexed where they appear, the first definition of a key wins
+        - $name macros are expanded from this dictionary and the ones enclosing it, values that
+          cannot be worked out here (#calc, code, unknown macros) read as missing
+        - only the top level dictionary owns the map, closing it closes its sub-dictionaries too
+    """
+
+    def __init__(self,filePath,_buf=None,_start=0,_end=None,_parent=None):
+        self.filePath = filePath
+        self._parent = _parent
+        self._root = self if _parent is None else _parent._root
+        self._ownsBuf = _buf is None
+        if _buf is None:
+            with open(filePath,'rb') as fp:
+                try:
+                    _buf = mmap.mmap(fp.fileno(),0,access=mmap.ACCESS_READ)
+                except ValueError:
+                    #empty files cannot be mapped
+                    _buf = b''
+        self._buf = _buf
+        self._end = len(_buf) if _end is None else _end
+        self._start = _start
+        self._scanPos = _start
+        self._index = {}
+        self._order = []
+        self._subDicts = {}
+        self._included = []
+        self.includePaths = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self,*exc):
+        self.close()
+
+    def close(self):
+        #included files are closed with the dictionary that included them, their entries are
+        #read from their own maps until then, sub-dictionaries leave the shared map to their root
+        if not self._ownsBuf:
+            return
+        for included in self._included:
+            included.close()
+        self._included = []
+        if isinstance(self._buf,mmap.mmap):
+            self._buf.close()
+
+    def includedFiles(self):
+        #every file an #include of the entries read so far pointed at, found or not, nested ones too
+        includePaths = list(self._root.includePaths)
+        for included in self._root._included:
+            includePaths.extend(path for path in included.includedFiles() if path not in includePaths)
+        return includePaths
+
+    def _addEntry(self,key,entry):
+        if key not in self._index:
+            self._index[key] = entry
+            self._order.append(key)
+
+    def _scanEntry(self):
+        #indexes the next top level entry, returns False at the end of the dictionary
+        tokens = tokenize(self._buf,self._scanPos,self._end)
+        for kind,token,start,stop in tokens:
+            if kind == 'punct':
+                continue
+            if kind == 'directive':
+                self._scanPos = self._scanDirective(token,tokens,stop)
+            else:
+                self._scanPos = self._scanValue(_text(token),stop)
+            return True
+        self._scanPos = self._end
+        return False
+
+    def _scanValue(self,key,pos):
+        #the value is either a { } block straight after the key or everything up to the closing ;
+        buf = self._buf
+        depth = 0
+        first = True
+        tokens = tokenize(buf,pos,self._end)
+        while True:
+            for kind,token,start,stop in tokens:
+                if kind == 'punct' and token == b'{':
+                    stop = _skipBlock(buf,stop,self._end)
+                    if first:
+                        self._addEntry(key,(self,'dict',start+1,stop-1))
+                        return stop
+                    #a dictionary nested inside a list, step over it and carry on to the ;
+                    tokens = tokenize(buf,stop,self._end)
+                    break
+                first = False
+                if kind != 'punct':
+                    continue
+                if token in (b'(',b'['):
+                    depth += 1
+                elif token in (b')',b']'):
+                    depth -= 1
+                elif token == b';' and depth == 0:
+                    self._addEntry(key,(self,'value',pos,start))
+                    return stop
+            else:
+                return self._end
+
+    def _scanDirective(self,directive,tokens,pos):
+        ##include and friends take one argument, anything else runs to the end of its line
+        if directive in (b'#include',b'#includeIfPresent',b'#sinclude'):
+            for kind,token,start,stop in tokens:
+                self._include(_text(token),required=(directive == b'#include'))
+                return stop
+        elif directive in (b'#includeEtc',b'#includeFunc',b'#inputMode',b'#remove',b'#default'):
+            for kind,token,start,stop in tokens:
+                return stop
+        lineEnd = self._buf.find(b'\n',pos,self._end)
+        return self._end if lineEnd < 0 else lineEnd
+
+    def _include(self,name,required=True):
+        baseDir = os.path.dirname(os.path.abspath(self.filePath))
+        caseDir = os.path.dirname(baseDir)
+        name = name.replace('${FOAM_CASE}',caseDir).replace('$FOAM_CASE',caseDir)
+        includePath = os.path.join(baseDir,os.path.expandvars(name))
+        if includePath not in self._root.includePaths:
+            self._root.includePaths.append(includePath)
+        if not os.path.isfile(includePath):
+            if required:
+                print("\tCannot find #include file %s, skipping..." % (includePath))
+            return
+        included = FoamDict(includePath)
+        self._root._included.append(included)
+        for key in included.keys():
+            self._addEntry(key,included._index[key])
+
+    def _lookup(self,key):
+        while key not in self._index and self._scanPos < self._end:
+            if not self._scanEntry():
+                break
+        return self._index.get(key)
+
+    def _resolve(self,name):
+        #the entry a $name macro refers to, in this dictionary or the nearest one enclosing it
+        scope = self
+        while scope is not None:
+            entry = scope._lookup(name)
+            if entry is not None:
+                return scope,entry
+            scope = scope._parent
+        raise UnresolvedValue("$%s is not defined" % (name))
+
+    def _valueTokens(self,entry,expanding):
+        #the tokens of a value with its macros expanded, expanding guards against macros naming themselves
+        owner,kind,start,end = entry
+        tokens = []
+        for tokenKind,token,_,_ in tokenize(owner._buf,start,end):
+            if tokenKind in ('directive','code'):
+                raise UnresolvedValue("%s values are worked out by OpenFOAM" % (_text(token)))
+            if tokenKind == 'word' and token.startswith(b'$'):
+                name = _macroName(token)
+                if name is None or name in expanding:
+                    raise UnresolvedValue("cannot expand %s" % (_text(token)))
+                scope,macro = self._resolve(name)
+                if macro[1] == 'dict':
+                    raise UnresolvedValue("$%s is a dictionary" % (name))
+                tokens.extend(scope._valueTokens(macro,expanding | {name}))
+            else:
+                tokens.append((tokenKind,token))
+        return tokens
+
+    def _materialize(self,entry):
+        owner,kind,start,end = entry
+        if kind == 'dict':
+            #sub-dictionaries keep their own lazy index between lookups
+            if start not in owner._subDicts:
+                owner._subDicts[start] = FoamDict(owner.filePath,owner._buf,start,end,_parent=self)
+            return owner._subDicts[start]
+        tokens = list(tokenize(owner._buf,start,end))
+        if len(tokens) == 1 and tokens[0][0] == 'word' and tokens[0][1].startswith(b'$'):
+            #a macro standing for a whole sub-dictionary
+            name = _macroName(tokens[0][1])
+            if name is not None:
+                scope,macro = self._resolve(name)
+                if macro[1] == 'dict':
+                    return scope._materialize(macro)
+        return parseValue(self._valueTokens(entry,frozenset()))
+
+    def get(self,key,default=None):
+        #default for a missing entry, and for one whose value cannot be worked out (see UnresolvedValue)
+        entry = self._lookup(key)
+        if entry is None:
+            return default
+        try:
+            return self._materialize(entry)
+        except UnresolvedValue:
+            return default
+
+    def __getitem__(self,key):
+        #raises UnresolvedValue for a value that cannot be worked out
+        entry = self._lookup(key)
+        if entry is None:
+            raise KeyError(key)
+        return self._materialize(entry)
+
+    def __contains__(self,key):
+        return self._lookup(key) is not None
+
+    def keys(self):
+        while self._scanPos < self._end and self._scanEntry():
+            pass
+        return list(self._order)
+
+    def items(self):
+        return [(key,self.get(key)) for key in self.keys()]
+
+    def find(self,key,default=None):
+        #depth first search through the sub-dictionaries for the first entry called key
+        value = self.get(key)
+        if value is not None:
+            return value
+        for name in self.keys():
+            entry = self._index[name]
+            if entry[1] == 'dict':
+                value = self._materialize(entry).find(key)
+                if value is not None:
+                    return value
+        return default
+
+    def words(self):
+        #every word and string in the dictionary, comments excluded
+        for kind,token,start,stop in tokenize(self._buf,self._start,self._end):
+            if kind in ('word','string'):
+                yield _text(token)
@@ -0,0 +1,64 @@
+import os
+import argparse as argparse
+from concurrent.futures import ThreadPoolExecutor
+
+
+IMAGES_DIR = 'postProcessing/images'
+IMAGE_EXTENSION = '.png'
+
+def imageDir(path,trial):
+    return os.path.join(path,trial,IMAGES_DIR)
+
+def scanTrialImages(path,trial):
+    """ One pass over <trial>/postProcessing/images, returns {(imageType, view): imagePath}
+        - imageType is the sub-directory, view is the part of the file name after its last _
+        - files are taken in sorted order and the first match of a type and view wins,
+          as glob("<imageType>/*_<view>.png")[0] would on a sorted listing
+    """
+    images = {}
+    try:
+        typeEntries = sorted(os.scandir(imageDir(path,trial)),key=lambda entry: entry.name)
+    except OSError:
+        return images
+    for typeEntry in typeEntries:
+        if not typeEntry.is_dir() or typeEntry.name.startswith('.'):
+            continue
+        with os.scandir(typeEntry.path) as entries:
+            names = sorted(entry.name for entry in entries if entry.is_file())
+        for name in names:
+            if name.startswith('.') or not name.endswith(IMAGE_EXTENSION):
+                continue
+            stem = name[:-len(IMAGE_EXTENSION)]
+            if '_' not in stem:
+                continue
+            view = stem.rsplit('_',1)[1]
+            images.setdefault((typeEntry.name,view),os.path.join(typeEntry.path,name))
+    return images
+
+def imageInventory(path,trials,workers=None):
+    #scans every trial concurrently, returns {(trial, imageType, view): imagePath}
+    inventory = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for trial,images in zip(trials,executor.map(lambda trial: scanTrialImages(path,trial),trials)):
+            for (imageType,view),imagePath in images.items():
+                inventory[(trial,imageType,view)] = imagePath
+    return inventory
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='Image Inventory',description='Lists the post-processing images of each trial by image type and view.')
+    parser.add_argument("trials", metavar='trial', nargs='*',
+                        help='Trials to scan, defaults to the current trial.')
+    parser.add_argument("-j","--workers", type=int,
+                        help='Number of scanning threads.')
+    args = parser.parse_args(argv)
+
+    path,case = os.path.split(os.getcwd())
+    trials = args.trials if args.trials else [case]
+    inventory = imageInventory(path,trials,args.workers)
+    for trial,imageType,view in sorted(inventory):
+        print("%s\t%s\t%s\t%s" % (trial,imageType,view,inventory[(trial,imageType,view)]))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,205 @@
+import os
+import io
+import json
+import fcntl
+import hashlib
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+
+#### REPORT MEDIA CACHE ####
+#images are downscaled to the size they are placed at in the report and re-encoded once, the
+#results are stored under the sha1 of the source image and the encoding settings so an unchanged
+#render is never processed again
+PLACED_WIDTH = 8.06
+DEFAULT_DPI = 200
+IMAGE_FORMATS = {'png':'.png','jpeg':'.jpg'}
+JPEG_QUALITY = 85
+CACHE_DIR = '.mediaCache'
+#part of every cached name, bumped when encodeImage changes what it makes so older copies are passed over
+ENCODING = 2
+
+def mediaCacheDir(casePath):
+    return os.path.join(casePath,'03_reports',CACHE_DIR)
+
+def _readSource(source):
+    #sources are image paths or the PNG bytes of an in-memory plot
+    if isinstance(source,bytes):
+        return source
+    with open(source,'rb') as fp:
+        return fp.read()
+
+def cachedName(digest,dpi,imageFormat):
+    return "%s_%gdpi_e%d%s" % (digest,dpi,ENCODING,IMAGE_FORMATS[imageFormat])
+
+def encodeImage(data,dpi=DEFAULT_DPI,imageFormat='png'):
+    """ Downscales an image to PLACED_WIDTH inches at dpi and re-encodes it, returns the new bytes
+        - images already narrower than the placed width are only re-encoded
+        - JPEGs have any transparency flattened onto white
+        - a PNG that was only re-encoded and would come out no smaller keeps the source bytes, a
+          downscaled one is kept whatever its size so the deck holds no more pixels than it shows
+    """
+    from PIL import Image
+    with Image.open(io.BytesIO(data)) as image:
+        image.load()
+        targetWidth = int(round(PLACED_WIDTH*dpi))
+        resized = image.width > targetWidth
+        if resized:
+            targetHeight = max(1,int(round(image.height*targetWidth/image.width)))
+            image = image.resize((targetWidth,targetHeight),Image.LANCZOS)
+
+        output = io.BytesIO()
+        if imageFormat == 'jpeg':
+            if image.mode in ('RGBA','LA','P'):
+                image = image.convert('RGBA')
+                flat = Image.new('RGB',image.size,(255,255,255))
+                flat.paste(image,mask=image.getchannel('A'))
+                image = flat
+            elif image.mode != 'RGB':
+                image = image.convert('RGB')
+            image.save(output,format='JPEG',quality=JPEG_QUALITY,optimize=True,progressive=True,dpi=(dpi,dpi))
+        else:
+            image.save(output,format='PNG',optimize=True,dpi=(dpi,dpi))
+            #resampled line plots gain colours and can compress worse than the flat original
+            if not resized and output.tell() >= len(data) and data.startswith(b'\x89PNG'):
+                return data
+    return output.getvalue()
+
+#### SOURCE HASH INDEX ####
+#sha1 of every source image keyed on its (mtime, size), kept in memory and beside the cache so a
+#later report over the same trials neither re-reads nor re-hashes renders that have not changed
+HASH_INDEX = 'hashes.json'
+
+_hashMemo = {}
+_hashMemoLock = threading.Lock()
+
+def fileStamp(filePath):
+    fileStat = os.stat(filePath)
+    return [fileStat.st_mtime_ns,fileStat.st_size]
+
+def loadHashIndex(cacheDir):
+    try:
+        with open(os.path.join(cacheDir,HASH_INDEX)) as fp:
+            hashIndex = json.load(fp)
+    except (OSError,ValueError):
+        return {}
+    return hashIndex if isinstance(hashIndex,dict) else {}
+
+def _mergeDigests(saved,hashIndex):
+    #entries for the same file keep the one hashed from its newer version
+    merged = dict(saved)
+    for realPath,memo in hashIndex.items():
+        if realPath not in merged or merged[realPath][:2] <= memo[:2]:
+            merged[realPath] = memo
+    return merged
+
+def saveHashIndex(cacheDir,hashIndex):
+    #merged into the saved index under a lock file, so batch workers and the stages of a report
+    #saving at once each add their digests instead of the last writer's replacing the others,
+    #then written to a temp file and renamed, read-only job trees just go without a persistent index
+    indexPath = os.path.join(cacheDir,HASH_INDEX)
+    tmpPath = "%s.%d.%d.tmp" % (indexPath,os.getpid(),threading.get_ident())
+    try:
+        os.makedirs(cacheDir,exist_ok=True)
+        with open(indexPath + '.lock','a') as lockFile:
+            fcntl.flock(lockFile,fcntl.LOCK_EX)
+            merged = _mergeDigests(loadHashIndex(cacheDir),hashIndex)
+            with open(tmpPath,'w') as fp:
+                json.dump(merged,fp)
+            os.replace(tmpPath,indexPath)
+    except OSError:
+        if os.path.exists(tmpPath):
+            os.remove(tmpPath)
+
+def knownDigest(filePath,hashIndex=None):
+    #sha1 of filePath if it is unchanged since it was last hashed, otherwise None
+    realPath = os.path.realpath(filePath)
+    stamp = fileStamp(realPath)
+    with _hashMemoLock:
+        memo = _hashMemo.get(realPath)
+    if memo is None and hashIndex is not None:
+        memo = hashIndex.get(realPath)
+    if memo is not None and memo[:2] == stamp:
+        return memo[2]
+    return None
+
+def rememberDigest(filePath,digest,hashIndex=None):
+    realPath = os.path.realpath(filePath)
+    memo = fileStamp(realPath) + [digest]
+    with _hashMemoLock:
+        _hashMemo[realPath] = memo
+    if hashIndex is not None:
+        hashIndex[realPath] = memo
+
+def fileDigest(filePath,hashIndex=None):
+    digest = knownDigest(filePath,hashIndex)
+    if digest is None:
+        digest = hashlib.sha1(_readSource(filePath)).hexdigest()
+        rememberDigest(filePath,digest,hashIndex)
+    return digest
+
+def processImage(source,cacheDir,dpi=DEFAULT_DPI,imageFormat='png',digest=None):
+    """ Returns (processedPath, sha1 of source), encoding source only if it is not cached yet
+        - digest: the already known sha1 of source, the source is then only read to be encoded
+    """
+    data = None
+    if digest is None:
+        data = _readSource(source)
+        digest = hashlib.sha1(data).hexdigest()
+    cachePath = os.path.join(cacheDir,cachedName(digest,dpi,imageFormat))
+    if os.path.isfile(cachePath):
+        return cachePath,digest
+
+    if data is None:
+        data = _readSource(source)
+    encoded = encodeImage(data,dpi,imageFormat)
+    #written to a temp file and renamed so parallel reports never embed half an image
+    os.makedirs(cacheDir,exist_ok=True)
+    tmpPath = "%s.%d.tmp" % (cachePath,os.getpid())
+    with open(tmpPath,'wb') as fp:
+        fp.write(encoded)
+    os.replace(tmpPath,cachePath)
+    return cachePath,digest
+
+def prepareImages(sources,cacheDir,dpi=DEFAULT_DPI,imageFormat='png',workers=None):
+    """ Processes every source in a process pool, returns {source: processedPath}
+        - sources are image paths, or (key, PNG bytes) pairs for in-memory plots
+        - unchanged sources already in the cache are resolved here without touching their files
+        - a source that cannot be read or decoded maps to itself, so it is embedded untouched
+    """
+    hashIndex = loadHashIndex(cacheDir)
+    processed = {}
+    pending = []
+    for source in sources:
+        if isinstance(source,tuple):
+            pending.append((source[0],source[1],None))
+            continue
+        try:
+            digest = knownDigest(source,hashIndex)
+        except OSError:
+            digest = None
+        if digest is not None:
+            cachePath = os.path.join(cacheDir,cachedName(digest,dpi,imageFormat))
+            if os.path.isfile(cachePath):
+                processed[source] = cachePath
+                continue
+        pending.append((source,source,digest))
+    if not pending:
+        return processed
+
+    #the stages of a report prepare their images from threads of its build graph, the workers come
+    #from a fork server rather than a fork of this process and whatever locks its threads hold
+    with ProcessPoolExecutor(max_workers=workers,mp_context=multiprocessing.get_context('forkserver')) as executor:
+        futures = [executor.submit(processImage,payload,cacheDir,dpi,imageFormat,digest) for key,payload,digest in pending]
+        for (key,payload,digest),future in zip(pending,futures):
+            try:
+                processed[key],digest = future.result()
+            except (OSError,ValueError) as error:
+                print("\tCould not process image %s: %s, embedding it as is..." % (key,error))
+                processed[key] = io.BytesIO(payload) if isinstance(payload,bytes) else payload
+                continue
+            if not isinstance(payload,bytes):
+                rememberDigest(payload,digest,hashIndex)
+    saveHashIndex(cacheDir,hashIndex)
+    return processed
@@ -1,131 +1,277 @@
 import os
+import io
 import sys
-import numpy as np
-import pandas as pd
-from pptx import Presentation
 from datetime import date
-from pptx.util import Inches, Pt
-from pptx.dml.color import RGBColor
-from bcParser_v1_0 import *
-from pptx.oxml.xmlchemy import OxmlElement
 import argparse as argparse 
-import glob as glob
+import threading
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+from bcParser_v1_0 import bcParser, caseSymmetry, CASE_FILES
+from campaignIndex import queryTrials, indexPath, avgFilePath
+from coeffEngine import loadCoeffs, CoeffTable, RESULT_LABELS, DELTA_LABELS
+from binPlotForces_v3_0 import plotBinDevelopment, plotFileName, BinPlotError, PLOT_NAMES
+from imageInventory import imageInventory
+from mediaCache import prepareImages, mediaCacheDir, loadHashIndex
+from reportManifest import ReportManifest, manifestPath, fileStamps, treeStamps
+from reportServer import requestReport
+
+#numpy and python-pptx are only loaded by the functions that build a deck, so --help and usage
+#errors return straight away, pandas is left until a summary.csv needs reading
 
+#### TEMPLATE PATH ####
+installPath = os.path.dirname(os.path.realpath(__file__))
 
-parser = argparse.ArgumentParser(prog='PPT Report Generator',description='Generates the powerpoint report for specified trials')
+templatePath = os.path.join(installPath,'pptTemplate','XXXXXX-Template_Presentation.pptx')
 
-parser.add_argument("-t","--caseNames", metavar='trial',nargs='+',
-                    help='Additional trials to be plotted, if doing current trial, leave blank!')
-     
-args = parser.parse_args()
+#surface image types and views placed in the report, in slide order
+IMAGE_TYPES = ['Geom_Surface','CpMean_Surface','CfMean_Surface','CpPrime2Mean_Surface','Q_isoSurface']
+VIEWS = ['Front','FrontLeft','Left','Bottom','RearLeft','Rear']
 
-#### Functions ####
-def SubElement(parent, tagname, **kwargs):
-    element = OxmlElement(tagname)
-    element.attrib.update(kwargs)
-    parent.append(element)
-    return element
 
+def parseArgs(argv=None):
+	parser = argparse.ArgumentParser(prog='PPT Report Generator',description='Generates the powerpoint report for specified trials')
 
-def _set_cell_border(cell, border_color="000000", border_width='500'):
-    """ Hack function to enable the setting of border width and border color
-        - bottom border only at present
-        (c) Steve Canny
-    """
-    tc = cell._tc
-    tcPr = tc.get_or_add_tcPr()
+	parser.add_argument("-t","--caseNames", metavar='trial',nargs='+',
+	                    help='Additional trials to be plotted, if doing current trial, leave blank!')
 
-    lnR = SubElement(
-        tcPr, 'a:lnR', w=border_width, cap='flat', cmpd='sng', algn='ctr')
-    solidFill = SubElement(lnR, 'a:solidFill')
-    srgbClr = SubElement(solidFill, 'a:srgbClr', val=border_color)
-    return cell
-################################################################################################
+	parser.add_argument("-b","--batch", metavar='groupFile',
+	                    help='Builds one report per line of groupFile, each line listing its trials with the reference first.')
 
-print("#### Running Post Pro Report Generator v2.0 ####")
+	parser.add_argument("-j","--workers", type=int,
+	                    help='Number of reports built at once in batch mode, defaults to the number of cores.')
 
+	parser.add_argument("-x","--index", action="store_true",
+	                    help='Reads trial BCs and averaged results from the campaign index (see campaignIndex.py) instead of the trial directories.')
 
-todays_date = date.today()
-path = os.path.split(os.getcwd())[0]
-case = os.path.split(os.getcwd())[1]
-casePath = os.path.split(path)[0]
-job = os.path.split(casePath)[1]
+	parser.add_argument("-r","--dpi", type=float, default=200,
+	                    help='Resolution the images are downscaled to at their placed size in the report (default 200).')
 
+	parser.add_argument("-f","--imageFormat", choices=['png','jpeg'], default='png',
+	                    help='Encoding of the downscaled images (default png).')
 
+	parser.add_argument("-R","--rawImages", action="store_true",
+	                    help='Embeds the images as they are on disk instead of downscaled copies.')
 
+	parser.add_argument("-F","--force", action="store_true",
+	                    help='Rebuilds every stage of the report, ignoring the manifest of the last build.')
 
-#### TEMPLATE PATH ####
-installPath = os.path.dirname(os.path.realpath(__file__))
+	parser.add_argument("-L","--local", action="store_true",
+	                    help='Builds the report in this process even when a report server is running.')
 
-templatePath = os.path.join(installPath,'pptTemplate','XXXXXX-Template_Presentation.pptx')
-print("TEMPLATE PATH: %s" % (templatePath))
-
-#Getting number of trials compared
-#numTrials = len(sys.argv)
-if args.caseNames is None:
-	numTrials = 1
-else:	
-	numTrials = len(args.caseNames) + 1
-
-caseArray = [case]
-
-#making the list of trials compared
-print("Getting data for trials:")
-print("\t%s" % (case))
-if args.caseNames is not None:
-	for i in args.caseNames:
-		caseArray.append(i)
-		print(i)
-
-
-def main():
-	#initializing the arrays for the trial boundary conditions
-	inletMagArray = []
-	lastTimeArray = []
-	yawArray = []
-	wheelRotationArray = []
-	simTypeArray = []
-	turbModelArray = []
-	caseSymArray = []
+	return parser.parse_args(argv)
 
+#### Functions ####
+def jobPaths(path):
+	#the job directory holding 02_trials and 03_reports, and its name
+	casePath = os.path.split(path)[0]
+	job = os.path.split(casePath)[1]
+	return casePath,job
+
+def prepareMedia(options,casePath,sources,workers=None):
+	#downscaled copies from the shared media cache, or the sources themselves with --rawImages
+	if options.rawImages:
+		return dict((source[0],io.BytesIO(source[1])) if isinstance(source,tuple) else (source,source) for source in sources)
+	return prepareImages(sources,mediaCacheDir(casePath),options.dpi,options.imageFormat,workers)
+
+def confPlotPaths(path,caseArray):
+	caseList = '_'.join(caseArray)
+	return ["%s/%s/%s_%s.png" % (path,caseArray[0],caseList,plot) for plot in ['forceHistory_Cd','forceHistory_Cl']]
+
+def stageInputs(path,caseArray,options):
+	#stamps of every file each stage of the deck is built from, see reportManifest.py
+	casePath,job = jobPaths(path)
+	bcFiles = [os.path.join(path,trial,caseFile) for trial in caseArray for caseFile in CASE_FILES + ['summary.csv']]
+	avgFiles = [avgFilePath(path,trial) for trial in caseArray]
+	if options.index:
+		bcFiles.append(indexPath(path))
+		avgFiles.append(indexPath(path))
+	binStamps = {}
+	imageStamps = {}
 	for trial in caseArray:
-		casePath = os.path.join(path,trial)
+		binStamps.update(treeStamps(os.path.join(path,trial,'postProcessing','binForceCoeffs'),depth=1))
+		imageStamps.update(treeStamps(os.path.join(path,trial,'postProcessing','images'),depth=1))
+	return {
+		'deck':{'template':fileStamps([templatePath]),'job':job,'trials':caseArray,
+		        'options':{'dpi':options.dpi,'imageFormat':options.imageFormat,'rawImages':options.rawImages,'index':options.index}},
+		'bc':fileStamps(bcFiles),
+		'results':fileStamps(avgFiles),
+		'confidence':fileStamps(confPlotPaths(path,caseArray)),
+		'development':{'bc':fileStamps(bcFiles),'bins':binStamps},
+		'images':imageStamps,
+	}
+
+def slideTitles(prs,start):
+	#titles of the slides added since there were start slides
+	return [slide.shapes.title.text for slide in list(prs.slides)[start:] if slide.shapes.title is not None]
+
+def runPostRun(arguments,cwd=None):
+	#postRun.py is not importable, run it with this interpreter and report failures instead of losing them,
+	#it works on the trial it is run from so cwd is the reference trial
+	command = [sys.executable,os.path.join(installPath,'postRun.py')] + arguments
+	result = subprocess.run(command,cwd=cwd)
+	if result.returncode != 0:
+		print("			%s failed with exit code %d" % (' '.join(command),result.returncode))
+	return result.returncode == 0
+
+def trialData(path,trials,options):
+	""" BC data and averaged coefficients of every trial, {trial: {field: value, 'coeffs': array or None}}
+		- taken from the campaign index with --index, otherwise summary.csv or the case files
+		- batch mode reads them once and shares them between every deck
+	"""
+	indexedTrials = queryTrials(path,trials) if options.index else {}
+
+	data = {}
+	for trial in trials:
+		trialPath = os.path.join(path,trial)
 		print('\n\tGetting BC data for %s...' % (trial))
-		if not os.path.isfile("%s/summary.csv" % (casePath)):
+		if trial in indexedTrials:
+			print("\t\tfound in campaign index...")
+			row = indexedTrials[trial]
+			values = [row['inletMag'],row['lastTime'],row['yaw'],row['wheelRotation'],row['simType'],row['turbModel'],row['symmetry']]
+		elif not os.path.isfile("%s/summary.csv" % (trialPath)):
 			print("\t\tsummary.csv not found... parsing system files...")
-			[inletMag,lastTime,yaw,wheelRotation,simType,turbModel]=bcParser(path,trial)
-			inletMagArray.append(inletMag)
-			lastTimeArray.append(lastTime)
-			yawArray.append(yaw)
-			wheelRotationArray.append(wheelRotation)
-			simTypeArray.append(simType)
-			turbModelArray.append(turbModel)
-			if "_half" in trial:
-				caseSym = "Half Car"
-				caseSymArray.append(caseSym)
-			else:
-				caseSym = "Full Car"
-				caseSymArray.append(caseSym)
+			values = list(bcParser(path,trial)) + [caseSymmetry(trial)]
 		else:
 			print("\t\tsummary.csv found... importing data...")
-			summaryData = pd.read_csv("%s/summary.csv" % (casePath), index_col=0)
+			import pandas as pd
+			summaryData = pd.read_csv("%s/summary.csv" % (trialPath), index_col=0)
 			summaryData = summaryData.transpose()
-			inletMagArray.append(summaryData['Velocity'].iloc[0])
-			lastTimeArray.append(summaryData['Iterations'].iloc[0])
-			yawArray.append(summaryData['Yaw'].iloc[0])
-			wheelRotationArray.append(summaryData['Moving Ground'].iloc[0])
-			simTypeArray.append(summaryData['Simulation Type'].iloc[0])
-			turbModelArray.append(summaryData['Turbulence Model'].iloc[0])
-			caseSymArray.append(summaryData['Symmetry'].iloc[0])
-
+			values = [summaryData[field].iloc[0] for field in ['Velocity','Iterations','Yaw','Moving Ground','Simulation Type','Turbulence Model','Symmetry']]
+		data[trial] = dict(zip(['inletMag','lastTime','yaw','wheelRotation','simType','turbModel','symmetry'],values))
 
-
-	
+	print("Checking for existance of averaged results...")
+	#every trial's averages in one array, the CSVs read side by side
+	coeffs,found = loadCoeffs(path,trials,options.index)
+	for n,trial in enumerate(trials):
+		if found[n]:
+			print("\t\t\ttrial%s_AVG_all_coeff.csv found... importing data..." % (trial))
+			data[trial]['coeffs'] = coeffs[n]
+		else:
+			print("\t\tCannot find average data for %s... skipping..." % (trial))
+			data[trial]['coeffs'] = None
+	return data
+
+
+def reportGraph(path,caseArray,options,manifest,inputs,trials=None,inventory=None,workers=None):
+	""" The files a deck is made from as a build graph (see buildGraph.py), each node's result is
+		what the slides need from it
+		- averages: the trials' averaged coefficient CSVs, only checked for
+		- trials: the BC data and averages of every trial, or the rows batch mode gathered
+		- confidence: both confidence plots from one postRun.py --forces run, when one is missing or
+		  older than the averages
+		- development: the bin development plots, when the bin forces or BCs are newer than them
+		- images: the slide images found for every trial and their processed copies
+		- workers: processes each plotting or image pool may start, defaults to the number of cores
+	"""
+	from buildGraph import BuildGraph
+	casePath,job = jobPaths(path)
+	graph = BuildGraph()
+
+	def loadTrials(results):
+		return trialData(path,caseArray,options) if trials is None else trials
+
+	def confidenceImages(results):
+		return prepareMedia(options,casePath,[plotPath for plotPath in confPlotPaths(path,caseArray) if os.path.isfile(plotPath)],workers)
+
+	def makeConfidencePlots(results):
+		print("			Confidence plots missing or out of date... generating them...")
+		runPostRun(['--forces','-s','-t'] + caseArray,cwd=os.path.join(path,caseArray[0]))
+		return confidenceImages(results)
+
+	#the plots are saved beside the reference trial, the plotter reuses the BC data gathered for the tables
+	developmentFiles = [os.path.join(path,caseArray[0],plotFileName(plotName,caseArray)) for plotName in PLOT_NAMES]
+
+	def makeDevelopmentPlots(results):
+		print("Creating development plots...")
+		caseData = {trial:{'simType':results['trials'][trial]['simType'],'lastTime':str(results['trials'][trial]['lastTime'])}
+		            for trial in caseArray}
+		try:
+			developmentPlots = plotBinDevelopment(path,caseArray,saveDir=os.path.join(path,caseArray[0]),noImage=True,
+			                                      caseData=caseData,buffers=True,workers=workers)
+		except BinPlotError as error:
+			print("			Could not create development plots: %s... will skip in report..." % (error))
+			developmentPlots = {}
+		return prepareMedia(options,casePath,[(plotName,buffer.getvalue()) for plotName,buffer in developmentPlots.items()],workers)
+
+	def reuseDevelopmentPlots(results):
+		print("			Development plots are newer than the bin forces, reusing them...")
+		developmentImages = prepareMedia(options,casePath,developmentFiles,workers)
+		return {plotName:developmentImages[plotPath] for plotName,plotPath in zip(PLOT_NAMES,developmentFiles)}
+
+	def slideImages(results):
+		#every trial's images directory is scanned once, the slides only look paths up
+		if inventory is not None:
+			print("			Using the image inventory shared by the batch...")
+			sourceInventory = inventory
+		elif not options.force and manifest.isFresh('images',inputs['images']):
+			print("			Image directories unchanged since the last report, reusing their inventory...")
+			sourceInventory = {tuple(key):imagePath for key,imagePath in manifest.data('images')}
+		else:
+			sourceInventory = imageInventory(path,caseArray)
+		images = sorted(set(imagePath for key,imagePath in sourceInventory.items() if key[1] in IMAGE_TYPES and key[2] in VIEWS))
+		images = prepareMedia(options,casePath,images,workers)
+		return sourceInventory,{key:images.get(imagePath,imagePath) for key,imagePath in sourceInventory.items()}
+
+	graph.add('averages',outputs=[avgFilePath(path,trial) for trial in caseArray])
+	graph.add('trials',loadTrials,after=['averages'])
+	graph.add('confidence',makeConfidencePlots,outputs=confPlotPaths(path,caseArray),after=['averages'],
+	          reuse=confidenceImages)
+	graph.add('development',makeDevelopmentPlots,inputs=list(inputs['development']['bc']) + list(inputs['development']['bins']),
+	          outputs=developmentFiles,after=['trials'],reuse=reuseDevelopmentPlots)
+	#the media cache keeps the processed copies up to date, so this node runs on every build
+	graph.add('images',slideImages,inputs=list(inputs['images']))
+	return graph
+
+def buildReport(path,caseArray,options,template=None,trials=None,inventory=None,workers=None):
+	""" Builds the report comparing caseArray, the first trial being the reference, returns its path
+		- template: the template file's bytes, parsed for this deck instead of reading the file
+		- trials: trialData rows already gathered for these trials
+		- inventory: an imageInventory covering these trials
+		- workers: processes each plotting or image pool of this deck may start
+	"""
+	import numpy as np
+	from pptx import Presentation
+	from pptx.util import Inches
+	from deckMedia import DeckMedia
+	from pptTable import addTableSlides
+
+	todays_date = date.today()
+	casePath,job = jobPaths(path)
+	numTrials = len(caseArray)
+
+	#stages whose inputs are unchanged since the last build reuse what that build left behind
+	reportDir = os.path.join(casePath,'03_reports')
+	manifest = ReportManifest(manifestPath(reportDir,caseArray))
+	inputs = stageInputs(path,caseArray,options)
+	if not options.force and manifest.reportIsCurrent(inputs):
+		reportPath = manifest.carryOver(reportFilePath(reportDir,caseArray,todays_date))
+		print("Report is up to date with its inputs: %s" % (reportPath))
+		return reportPath
+
+	#the plots, averages and images the slides show are brought up to date first, side by side
+	graph = reportGraph(path,caseArray,options,manifest,inputs,trials,inventory,workers)
+	results = graph.run(force=options.force)
+	if graph.missing:
+		print("Missing inputs for: %s" % (', '.join(graph.missing)))
+	trials = results['trials']
+
+	#the arrays of the trial boundary conditions
+	inletMagArray = [trials[trial]['inletMag'] for trial in caseArray]
+	yawArray = [trials[trial]['yaw'] for trial in caseArray]
+	wheelRotationArray = [trials[trial]['wheelRotation'] for trial in caseArray]
+	simTypeArray = [trials[trial]['simType'] for trial in caseArray]
+	turbModelArray = [trials[trial]['turbModel'] for trial in caseArray]
+	caseSymArray = [trials[trial]['symmetry'] for trial in caseArray]
 
 	#### Setting up Presentation ####
 
 	#getting the presentation template
-	prs = Presentation(templatePath)
+	#a batch reads the template once and every deck parses its own copy from memory
+	prs = Presentation(templatePath) if template is None else Presentation(io.BytesIO(template))
+	#identical images (the same render on several slides, or across reports through the media cache) share one part
+	media = DeckMedia(prs,mediaCacheDir(casePath),loadHashIndex(mediaCacheDir(casePath)))
+	manifest.record('deck',inputs['deck'])
+	nSlides = len(prs.slides)
 
 	print("Making title slide...")
 	#setting up the title slide
@@ -140,213 +286,33 @@ def main():
 
 	#### INFO SLIDE SET UP ####
 	print("Making info slide...")
-	infoTableLayout = prs.slide_layouts[5]
-	infoTableSlide = prs.slides.add_slide(infoTableLayout)
-	infoTableTitle = infoTableSlide.shapes.title
-	infoTableTitle.text = "Trial Setup and BC" #set the title of the trial set up and boundary conditions slide
-	table_placeholder = infoTableSlide.shapes[1]
-	nCols = numTrials + 1 #number of columns is number of trials plus 1
-	shape = table_placeholder.insert_table(rows=7, cols=nCols)
-	table = shape.table
-
-	#making row lables
+	#one column per trial, wide comparisons carry on over several slides
 	rowLabelText = ['Trial','Run Type','Velocity (m/s)','Turb. Model','Wheel Rot.','Yaw Angle (deg)','Sym. Cond.']
-	#adding text to the rowLabels
-	i = 0
-	for text in rowLabelText:
-		table.cell(i,0).text = text
-		i = i + 1
-
-	#adding data for each trials column
-	i = 0 
-	while i < numTrials:
-		table.cell(0,i+1).text = caseArray[i]
-		table.cell(1,i+1).text = simTypeArray[i]
-		table.cell(2,i+1).text = str(inletMagArray[i])
-		table.cell(3,i+1).text = turbModelArray[i]
-		table.cell(4,i+1).text = str(wheelRotationArray[i])
-		table.cell(5,i+1).text = str(yawArray[i])
-		table.cell(6,i+1).text = caseSymArray[i]
-		i = i + 1
-		
-
-	for j in range(numTrials + 1):
-		for i in range(len(rowLabelText)):
-			
-			cell = table.cell(i,j)
-			cell = _set_cell_border(cell)
-			table.cell(i,j).fill.solid()
-			table.cell(i,j).text_frame.paragraphs[0].font.size = Pt(14)
-			table.cell(i,j).text_frame.paragraphs[0].font.color.rgb = RGBColor(0, 0, 0)
-			if i == 0:
-				table.cell(i,j).fill.fore_color.rgb = RGBColor(192,192,192)
-			else:
-				table.cell(i,j).fill.fore_color.rgb = RGBColor(225,225,225)
+	infoColumns = [[str(value) for value in column] for column in
+	               zip(caseArray,simTypeArray,inletMagArray,turbModelArray,wheelRotationArray,yawArray,caseSymArray)]
+	addTableSlides(prs,prs.slide_layouts[5],"Trial Setup and BC",rowLabelText,infoColumns)
 
+	manifest.record('bc',inputs['bc'],slideTitles(prs,nSlides))
+	nSlides = len(prs.slides)
 
 	#### RESULT TABLE ####
-	print("Checking for existance of averaged results...")
-
-	coeffs = np.zeros((6,numTrials))
-	n = 0
-	for trial in caseArray:
-		avgFile = "trial%s_AVG_all_coeff.csv" % (trial)
-		if os.path.isfile("%s/%s/%s" % (path,trial,avgFile)):
-			print("\t\t\t%s found... importing data..." % (avgFile))
-			# Defining the columns to read
-			avgData = np.loadtxt("%s/%s/%s" % (path,trial,avgFile), 
-						dtype='float', 
-						comments='#', 
-						delimiter=",",
-						skiprows = 1,
-						usecols=(1,2,3,4,7,8), 
-						unpack=False, ndmin=0)
-			
-			coeffs[:,n] = avgData
-		else: 
-			print("		Cannot find average data... skipping...")
-
-		n = n + 1
-	
-
-
+	#the averages were read with the BC data, trials without any are left as zeros
+	coeffTable = CoeffTable(caseArray,[trials[trial]['coeffs'] if trials[trial]['coeffs'] is not None else np.zeros(6) for trial in caseArray])
 
 	print("Making results slide...")
-	resultsTableLayout = prs.slide_layouts[5]
-	resultsTableSlide = prs.slides.add_slide(resultsTableLayout)
-	resultsTableTitle = resultsTableSlide.shapes.title
-	resultsTableTitle.text = "Results" #set the title of the trial set up and boundary conditions slide
-	table_placeholder = resultsTableSlide.shapes[1]
-	nCols = numTrials + 1 #number of columns is number of trials plus 1
-	shape = table_placeholder.insert_table(rows=8, cols=nCols)
-	table = shape.table
-
-	#making row lables
-	rowLabelText = ['Trial','CdA','ClA','ClfA','ClrA','0.95 CI. - CdA','0.95 CI. - ClA','% Front']
-	#adding text to the rowLabels
-	i = 0
-	for text in rowLabelText:
-		table.cell(i,0).text = text
-		i = i + 1
-
-	#adding data for each trials column
-	i = 0 
-	percentFrontArray = []
-
-	while i < numTrials:
-
-		cl = (coeffs[1,i])
-		clf = (coeffs[2,i])
-		percentFront = 100*clf/cl
-		percentFrontArray.append(percentFront)
-
-		i = i + 1
-		
-
-	i = 0
-	while i < numTrials:
-		#naming first row in column as trial name
-		table.cell(0,i+1).text = caseArray[i]
-
-		j = 1
-		while j < 7:
-			#assigning each value a number
-			
-			if i == 0:
-				table.cell(j,i+1).text = str("%0.3f" % (coeffs[j-1,i]))
-			else:
-				table.cell(j,i+1).text = str("%0.3f" % (coeffs[j-1,i]))
-			j = j + 1
-		
-		table.cell(7,i+1).text = str("%0.1f"%(percentFrontArray[i]))
-		
-		i = i + 1
-
-
-	for j in range(numTrials + 1):
-		for i in range(len(rowLabelText)):
-			
-			cell = table.cell(i,j)
-			cell = _set_cell_border(cell)
-			table.cell(i,j).fill.solid()
-			table.cell(i,j).text_frame.paragraphs[0].font.size = Pt(14)
-			table.cell(i,j).text_frame.paragraphs[0].font.color.rgb = RGBColor(0, 0, 0)
-			if i == 0:
-				table.cell(i,j).fill.fore_color.rgb = RGBColor(192,192,192)
-			else:
-				table.cell(i,j).fill.fore_color.rgb = RGBColor(225,225,225)
+	addTableSlides(prs,prs.slide_layouts[5],"Results",RESULT_LABELS,coeffTable.resultColumns())
 
 	#### Deltas TABLE ####
 	if numTrials > 1:
-		percentFrontArray = []
 		print("Caltulating deltas results...")
 		print("Making deltas slide...")
-		resultsTableLayout = prs.slide_layouts[5]
-		resultsTableSlide = prs.slides.add_slide(resultsTableLayout)
-		resultsTableTitle = resultsTableSlide.shapes.title
-		resultsTableTitle.text = "Results Delta to %s" % (caseArray[0]) #set the title of the trial set up and boundary conditions slide, naming it for delta
-		table_placeholder = resultsTableSlide.shapes[1]
-		nCols = numTrials #number of columns is number of trials plus 1 minus one for deltas, as the first trial is the reference
-		shape = table_placeholder.insert_table(rows=6, cols=nCols)
-		table = shape.table
-
-		#making row lables
-		rowLabelText = ['Trial','deltaCdA','deltaClA','deltaClfA','deltaClrA','delta % Front']
-		#rowLabelText = ['Trial','deltaCdA','deltaClA','deltaClfA','deltaClrA','0.95 CI. - deltaCdA','0.95 CI. - deltaClA','delta % Front']
-		#adding text to the rowLabels
-		i = 0
-		for text in rowLabelText:
-			table.cell(i,0).text = text
-			i = i + 1
-
-		#adding data for each trials column
-		i = 1
-		percentFrontArray = []
-		clRef = coeffs[1,0]
-		clfRef = coeffs[2,0]
-		while i < numTrials:
-			cl = (coeffs[1,i])
-			clf = (coeffs[2,i])
-			percentFront = (100*clf/cl) - (100*clfRef/clRef)
-			percentFrontArray.append(percentFront)
-			i = i + 1
-		i = 1
-
-		while i < numTrials:
-			#naming first row in column as trial name
-			table.cell(0,i).text = caseArray[i]
-
-			j = 1
-			while j < 5:
-				#assigning each value a number
-				
-				# if j == 5:
-				# 	table.cell(j,i+1).text = str("%0.3f" % (np.sqrt(coeffs[4,i]**2+coeffs[4,0]**2)))
-				# elif j == 6:
-				# 	table.cell(j,i+1).text = str("%0.3f" % (np.sqrt(coeffs[5,i]**2+coeffs[5,0]**2)))
-				
-				table.cell(j,i).text = str("%0.3f" % (coeffs[j-1,i]-coeffs[j-1,0]))
-				j = j + 1
-			
-			table.cell(5,i).text = str("%0.1f"%(percentFrontArray[i-1]))
-			
-			i = i + 1
-
-
-		for j in range(numTrials-1):
-			for i in range(len(rowLabelText)):
-				
-				cell = table.cell(i,j)
-				cell = _set_cell_border(cell)
-				table.cell(i,j).fill.solid()
-				table.cell(i,j).text_frame.paragraphs[0].font.size = Pt(14)
-				table.cell(i,j).text_frame.paragraphs[0].font.color.rgb = RGBColor(0, 0, 0)
-				if i == 0:
-					table.cell(i,j).fill.fore_color.rgb = RGBColor(192,192,192)
-				else:
-					table.cell(i,j).fill.fore_color.rgb = RGBColor(225,225,225)
+		#the first trial is the reference, so it has no column of its own
+		addTableSlides(prs,prs.slide_layouts[5],"Results Delta to %s" % (caseArray[0]),DELTA_LABELS,coeffTable.deltaColumns(0))
 
 	
+	manifest.record('results',inputs['results'],slideTitles(prs,nSlides))
+	nSlides = len(prs.slides)
+
 	#### Confidence Plot SLIDES ####
 	print("Checking for Confidence Plot image existance...")
 	plotArray = ['forceHistory_Cd','forceHistory_Cl']
@@ -375,77 +341,56 @@ def main():
 	# 			pass
 	
 	
-	for plot in plotArray:
-		toPlotList = ' '.join(caseArray)
-		caseList = '_'.join(caseArray)
-		plotImage = "%s_%s.png" % (caseList,plot)
-		if os.path.isfile("%s/%s/%s" % (path,caseArray[0],plotImage)):
-			print("			Found %s..." % (plotImage))
-		else:
-			print("			Cannot find %s... will attempt to generate..." % (plotImage))
-			#generating the confidence plots if not found
-			command = "python3.8 %s/postRun.py --forces -s -t %s" % (installPath,toPlotList)
-			os.system(command)
-
 	print("Making confidence plot slides...")
+	caseList = '_'.join(caseArray)
+	confPlotImages = results['confidence']
 	for plot in plotArray:
 		confPlotLayout = prs.slide_layouts[6]
 		confPlotSlide = prs.slides.add_slide(confPlotLayout)
 		confPlotSlideTitle = confPlotSlide.shapes.title
 		confPlotSlideTitle.text = "%s" % (plot) #set the title of the geom slides
 		confPlot_placeholder = confPlotSlide.shapes[1]
-		plotImage = "%s_%s.png" % (caseList,plot)
-		if os.path.isfile("%s/%s/%s" % (path,caseArray[0],plotImage)):
+		plotImage = "%s/%s/%s_%s.png" % (path,caseArray[0],caseList,plot)
+		if plotImage in confPlotImages:
 			#insertConfPlotImage = confPlot_placeholder.insert_picture("%s/%s/%s" % (path,caseArray[0],plotImage))
-			insertConfPlotImage = confPlotSlide.shapes.add_picture("%s/%s/%s" % (path,caseArray[0],plotImage),left=Inches(2.688), top=Inches(1.7),width=Inches(8.06))
+			insertConfPlotImage = media.addPicture(confPlotSlide,confPlotImages[plotImage],left=Inches(2.688), top=Inches(1.7),width=Inches(8.06))
 		else:
 			pass
 	
 
+	#the plots may have just been generated, so their stamps are taken again
+	manifest.record('confidence',fileStamps(confPlotPaths(path,caseArray)),slideTitles(prs,nSlides))
+	nSlides = len(prs.slides)
+
 	#### Development Plot SLIDES ####
-	print("Creating development plots...")
-	if len(caseArray) < 2:
-		caseCommandString = ""
-		command = "python3.8 %s/binPlotForces_v3_0.py -s -n -i" % (installPath)
-	else:
-		caseCommandString = " ".join(caseArray[1:])
-		command = "python3.8 %s/binPlotForces_v3_0.py -t %s -s -n -i" % (installPath,caseCommandString)
-		
 	caseString = "_".join(caseArray)
-	os.system(command)
 	plotArray = ["cd-development_%s" % (caseString),"cl-development_%s" % (caseString)]
-
-
-	print("		Checking in trial%s" % (trial))
-	for plot in plotArray:
-		plotImage = "%s.png" % (plot)
-		if os.path.isfile("%s/%s/%s" % (path,case,plotImage)):
-			print("			Found %s..." % (plotImage))
-		else:
-			print("			Cannot find %s... will skip in report..." % (plotImage))
+	developmentPlots = results['development']
+	developmentFiles = [os.path.join(path,caseArray[0],plotFileName(plotName,caseArray)) for plotName in PLOT_NAMES]
 
 	print("Making development plot slides...")
-	for plot in plotArray:
+	for plotName,plot in zip(PLOT_NAMES,plotArray):
 
 		confPlotLayout = prs.slide_layouts[6]
 		confPlotSlide = prs.slides.add_slide(confPlotLayout)
 		confPlotSlideTitle = confPlotSlide.shapes.title
 		confPlotSlideTitle.text = "%s" % (plot) #set the title of the geom slides
 		confPlot_placeholder = confPlotSlide.shapes[1]
-		plotImage = "%s.png" % (plot)
-		if os.path.isfile("%s/%s/%s" % (path,case,plotImage)):
-			insertConfPlotImage = confPlotSlide.shapes.add_picture("%s/%s/%s" % (path,caseArray[0],plotImage),left=Inches(2.688), top=Inches(1.7),width=Inches(8.06))
+		if plotName in developmentPlots:
+			insertConfPlotImage = media.addPicture(confPlotSlide,developmentPlots[plotName],left=Inches(2.688), top=Inches(1.7),width=Inches(8.06))
 		else:
 			pass
-	
-	
 
-	
+	#the plots were saved beside the reference trial, a failed plot leaves no artifact so the stage is redone
+	plotted = [plotName for plotName in PLOT_NAMES if plotName in developmentPlots]
+	manifest.record('development',inputs['development'],slideTitles(prs,nSlides),
+	                artifacts=[developmentFiles[PLOT_NAMES.index(plotName)] for plotName in plotted],data=plotted)
+	nSlides = len(prs.slides)
 
 	
 	#### GEOMETRY SLIDES ####
 	print("Checking for geometry image existance...")
-	viewsArray = ['Front','FrontLeft','Left','Bottom','RearLeft','Rear']
+	viewsArray = VIEWS
 
 	# for trial in caseArray:
 	# 	print("		Checking in trial%s" % (trial))
@@ -474,14 +419,22 @@ def main():
 	# 		else:
 	# 			pass
 
-	insertImages('Geom_Surface',path,viewsArray,caseArray,prs)
-	insertImages('CpMean_Surface',path,viewsArray,caseArray,prs)
-	insertImages('CfMean_Surface',path,viewsArray,caseArray,prs)
-	insertImages('CpPrime2Mean_Surface',path,viewsArray,caseArray,prs)
-	insertImages('Geom_Surface',path,viewsArray,caseArray,prs)
-	insertImages('Q_isoSurface',path,viewsArray,caseArray,prs)
-	outputReport(prs,caseArray,casePath,todays_date)	
-	return
+	sourceInventory,images = results['images']
+	insertImages('Geom_Surface',sourceInventory,images,viewsArray,caseArray,prs,media)
+	insertImages('CpMean_Surface',sourceInventory,images,viewsArray,caseArray,prs,media)
+	insertImages('CfMean_Surface',sourceInventory,images,viewsArray,caseArray,prs,media)
+	insertImages('CpPrime2Mean_Surface',sourceInventory,images,viewsArray,caseArray,prs,media)
+	insertImages('Geom_Surface',sourceInventory,images,viewsArray,caseArray,prs,media)
+	insertImages('Q_isoSurface',sourceInventory,images,viewsArray,caseArray,prs,media)
+	manifest.record('images',inputs['images'],slideTitles(prs,nSlides),
+	                data=[[list(key),imagePath] for key,imagePath in sorted(sourceInventory.items()) if key[0] in caseArray])
+	reportPath = outputReport(prs,caseArray,reportDir,todays_date)
+	media.close()
+	staleStages = manifest.staleStages()
+	if staleStages:
+		print("Rebuilt stages with changed inputs: %s" % (', '.join(staleStages)))
+	manifest.save(reportPath)
+	return reportPath
 
 	#### CP SLIDES ####
 	print("Checking for CP image existance...")
@@ -625,7 +578,9 @@ def main():
 
 
 
-def insertImages(imageType,path,viewsArray,caseArray,prs):
+def insertImages(imageType,inventory,images,viewsArray,caseArray,prs,media):
+	#inventory holds the source images, images their processed copies under the same keys
+	from pptx.util import Inches
 	print("Making geometry slides...")
 
 	for view in viewsArray:
@@ -637,18 +592,134 @@ def insertImages(imageType,path,viewsArray,caseArray,prs):
 			geomSlideTitle.text = "%s - %s - %s" % (imageType.replace('_',' '),trial,view) #set the title of the geom slides
 			geom_placeholder = geomSlide.shapes[1]
 			geomImage = "%s_%s_%s.png" % (imageType,trial,view)
-			imagePath = glob.glob("%s/%s/postProcessing/images/%s/*_%s.png" % (path,trial,imageType,view))
-			if len(imagePath) > 0:
-				print('\t\t\t\tFound %s' % (imagePath[0].split('/')[-1]))
-				insertGeomImage = geomSlide.shapes.add_picture(imagePath[0],left=Inches(2.688), top=Inches(1.7),width=Inches(8.06))
+			imagePath = inventory.get((trial,imageType,view))
+			if imagePath is not None:
+				print('\t\t\t\tFound %s' % (imagePath.split('/')[-1]))
+				insertGeomImage = media.addPicture(geomSlide,images.get((trial,imageType,view),imagePath),left=Inches(2.688), top=Inches(1.7),width=Inches(8.06))
 			else:
 				pass
 	return prs
 
-def outputReport(prs,caseArray,casePath,todays_date):
+def reportFilePath(reportDir,caseArray,todays_date):
 	reportName = '_'.join(caseArray)
-	print("Saving file to: ../../03_reports/%s_report_%s.pptx" % (reportName,todays_date))
-	prs.save("../../03_reports/%s_report_%s.pptx" % (reportName,todays_date))
-
-
-main()
+	return os.path.join(reportDir,"%s_report_%s.pptx" % (reportName,todays_date))
+
+def outputReport(prs,caseArray,reportDir,todays_date):
+	reportPath = reportFilePath(reportDir,caseArray,todays_date)
+	print("Saving file to: %s" % (reportPath))
+	#the image parts are read from their files as the zip is written, into a temp file renamed over
+	#the report once complete so an interrupted save never leaves a truncated deck
+	tmpPath = "%s.%d.%d.tmp" % (reportPath,os.getpid(),threading.get_ident())
+	try:
+		prs.save(tmpPath)
+		os.replace(tmpPath,reportPath)
+	finally:
+		if os.path.exists(tmpPath):
+			os.remove(tmpPath)
+	return reportPath
+
+#### BATCH MODE ####
+#each worker is handed the template's bytes once and parses them for every deck it builds
+_workerTemplate = None
+
+def _initWorker(templateBytes):
+	global _workerTemplate
+	_workerTemplate = templateBytes
+
+def _buildInWorker(path,caseArray,options,trials,inventory,workers):
+	return buildReport(path,caseArray,options,template=_workerTemplate,trials=trials,inventory=inventory,workers=workers)
+
+def readBatchFile(batchPath):
+	#one deck per line, the first trial on a line is its reference, # starts a comment
+	groups = []
+	with open(batchPath) as fp:
+		for line in fp:
+			trials = line.split('#',1)[0].split()
+			if trials:
+				groups.append(trials)
+	return groups
+
+def batchReports(path,groups,options,workers=None):
+	""" Builds one deck per trial group in a pool of worker processes, returns {group: reportPath}
+		- the BC data, averages and image inventory of every trial are gathered once for all decks
+		- the surface images are processed once up front, so the decks only hit the media cache
+		- the cores are shared out between the decks, each deck's plotting and image pools get
+		  cpu_count // workers processes rather than one per core each
+	"""
+	casePath,job = jobPaths(path)
+	allTrials = sorted(set(trial for group in groups for trial in group))
+	trials = trialData(path,allTrials,options)
+	inventory = imageInventory(path,allTrials)
+	slideImages = sorted(set(imagePath for key,imagePath in inventory.items() if key[1] in IMAGE_TYPES and key[2] in VIEWS))
+	prepareMedia(options,casePath,slideImages)
+	with open(templatePath,'rb') as fp:
+		templateBytes = fp.read()
+
+	batchWorkers = workers or os.cpu_count() or 1
+	deckWorkers = max(1,(os.cpu_count() or 1)//batchWorkers)
+
+	reports = {}
+	with ProcessPoolExecutor(max_workers=batchWorkers,initializer=_initWorker,initargs=(templateBytes,)) as executor:
+		futures = {}
+		for group in groups:
+			groupTrials = {trial:trials[trial] for trial in group}
+			futures[tuple(group)] = executor.submit(_buildInWorker,path,group,options,groupTrials,inventory,deckWorkers)
+		for group,future in futures.items():
+			try:
+				reports[group] = future.result()
+			except Exception as error:
+				print("Could not build the report for %s: %s" % (' '.join(group),error))
+				reports[group] = None
+	return reports
+
+
+def generate(cwd,args,template=None):
+	""" Builds the reports asked for by args as if run from the trial directory cwd
+		- returns (reportPaths, failedGroups), used by main and by the report server
+	"""
+	path = os.path.split(cwd)[0]
+	case = os.path.split(cwd)[1]
+
+	if args.batch is not None:
+		groups = readBatchFile(os.path.join(cwd,args.batch))
+		print("Building %d reports..." % (len(groups)))
+		reports = batchReports(path,groups,args,args.workers)
+		failed = [' '.join(group) for group,reportPath in reports.items() if reportPath is None]
+		return [reportPath for reportPath in reports.values() if reportPath is not None],failed
+
+	caseArray = [case]
+
+	#making the list of trials compared
+	print("Getting data for trials:")
+	print("\t%s" % (case))
+	if args.caseNames is not None:
+		for i in args.caseNames:
+			caseArray.append(i)
+			print(i)
+
+	return [buildReport(path,caseArray,args,template=template)],[]
+
+def main(argv=None):
+	args = parseArgs(argv)
+
+	#a running report server (see reportServer.py) already has everything loaded, hand the job to it
+	if not args.local:
+		response = requestReport(os.getcwd(),sys.argv[1:] if argv is None else argv)
+		if response is not None:
+			if not response['ok']:
+				sys.exit("Report server failed: %s" % (response['error']))
+			for reportPath in response['reports']:
+				print("Report server saved: %s" % (reportPath))
+			if response['failed']:
+				sys.exit("Reports failed for: %s" % ('; '.join(response['failed'])))
+			return
+
+	print("#### Running Post Pro Report Generator v2.0 ####")
+	print("TEMPLATE PATH: %s" % (templatePath))
+	reports,failed = generate(os.getcwd(),args)
+	if failed:
+		sys.exit("Reports failed for: %s" % ('; '.join(failed)))
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,72 @@
+from xml.sax.saxutils import escape
+from pptx.oxml import parse_xml
+
+
+#### REPORT TABLES ####
+#the tables are written as a single a:tbl element instead of cell by cell through python-pptx,
+#every cell shares the report styling: 14pt black text, a thin black right border and a grey fill
+MAX_TABLE_COLUMNS = 8
+FONT_SIZE = 1400
+HEADER_FILL = 'C0C0C0'
+BODY_FILL = 'E1E1E1'
+BORDER_COLOR = '000000'
+BORDER_WIDTH = 500
+
+_NAMESPACE = 'xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main"'
+
+_CELL = ('<a:tc><a:txBody><a:bodyPr/><a:lstStyle/><a:p><a:pPr><a:defRPr sz="%d"><a:solidFill>'
+         '<a:srgbClr val="000000"/></a:solidFill></a:defRPr></a:pPr>%%s</a:p></a:txBody><a:tcPr>'
+         '<a:lnR w="%d" cap="flat" cmpd="sng" algn="ctr"><a:solidFill><a:srgbClr val="%s"/></a:solidFill>'
+         '</a:lnR><a:solidFill><a:srgbClr val="%%s"/></a:solidFill></a:tcPr></a:tc>') % (FONT_SIZE,BORDER_WIDTH,BORDER_COLOR)
+
+def _cellXml(text,fill):
+    run = '<a:r><a:t>%s</a:t></a:r>' % (escape(text)) if text else ''
+    return _CELL % (run,fill)
+
+def tableXml(rows,tblPr,colWidth,rowHeight):
+    """ The a:tbl element of rows (a list of rows of strings), built in one pass
+        - tblPr is the table properties xml kept from the placeholder's table
+        - the first row is the header row
+    """
+    nCols = len(rows[0])
+    parts = ['<a:tbl %s>' % (_NAMESPACE),tblPr,'<a:tblGrid>','<a:gridCol w="%d"/>' % (colWidth)*nCols,'</a:tblGrid>']
+    for i,row in enumerate(rows):
+        fill = HEADER_FILL if i == 0 else BODY_FILL
+        parts.append('<a:tr h="%d">' % (rowHeight))
+        parts.extend(_cellXml(text,fill) for text in row)
+        parts.append('</a:tr>')
+    parts.append('</a:tbl>')
+    return parse_xml(''.join(parts))
+
+def insertTable(placeholder,rows):
+    #fills a table placeholder with rows, keeping the frame and table style the placeholder gives
+    from lxml import etree
+    shape = placeholder.insert_table(rows=len(rows),cols=len(rows[0]))
+    oldTbl = shape._element.graphic.graphicData.tbl
+    tblPr = etree.tostring(oldTbl.tblPr).decode()
+    colWidth = oldTbl.tblGrid.gridCol_lst[0].w
+    rowHeight = oldTbl.tr_lst[0].h
+    oldTbl.getparent().replace(oldTbl,tableXml(rows,tblPr,colWidth,rowHeight))
+    return shape
+
+def tablePages(rowLabels,columns,maxColumns=MAX_TABLE_COLUMNS):
+    """ Splits the data columns into pages of at most maxColumns, each led by the row labels
+        - columns is a sequence of columns, each a sequence of strings, one per row label
+        - returns a list of tables, each a list of rows
+    """
+    pages = []
+    for start in range(0,max(len(columns),1),maxColumns):
+        pageColumns = [rowLabels] + [list(column) for column in columns[start:start+maxColumns]]
+        pages.append([list(row) for row in zip(*pageColumns)])
+    return pages
+
+def addTableSlides(prs,layout,title,rowLabels,columns,maxColumns=MAX_TABLE_COLUMNS):
+    #one slide per page of the table, titled "<title> (n/N)" when it does not fit on one
+    pages = tablePages(rowLabels,columns,maxColumns)
+    slides = []
+    for n,rows in enumerate(pages):
+        slide = prs.slides.add_slide(layout)
+        slide.shapes.title.text = title if len(pages) == 1 else "%s (%d/%d)" % (title,n+1,len(pages))
+        insertTable(slide.shapes[1],rows)
+        slides.append(slide)
+    return slides
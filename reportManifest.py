@@ -0,0 +1,137 @@
+import os
+import json
+import shutil
+import threading
+
+
+#### REPORT MANIFEST ####
+#written beside each report, it records for every stage of the deck the (mtime, size) of the
+#files it was built from, the artifacts it left behind and the slides it made, so a rerun can
+#reuse whatever did not change
+MANIFEST_VERSION = 1
+MANIFEST_SUFFIX = '_report.manifest.json'
+#caches the readers leave beside their sources (binForceReader's time index and history, and the
+#temp files they are written through), they change without the inputs changing
+CACHE_SUFFIXES = ('.tidx.npz','.npycache','.tmp','.tmp.npz')
+DIRECTORY = 'dir'
+
+def manifestPath(reportDir,caseArray):
+    #one manifest per trial set, independent of the date in the report name
+    return os.path.join(reportDir,'_'.join(caseArray) + MANIFEST_SUFFIX)
+
+def fileStamp(filePath):
+    #[mtime_ns, size], or None for a file that does not exist
+    try:
+        fileStat = os.stat(filePath)
+    except OSError:
+        return None
+    return [fileStat.st_mtime_ns,fileStat.st_size]
+
+def fileStamps(filePaths):
+    return {filePath:fileStamp(filePath) for filePath in filePaths}
+
+def treeStamps(root,depth=1):
+    """ Stamps of root and everything below it down to depth levels of sub-directories
+        - directories are only stamped as present, added or removed files show up as added or
+          removed entries, while the caches written beside the sources would bump their mtime
+        - hidden entries and reader caches (CACHE_SUFFIXES) are left out
+    """
+    if not os.path.isdir(root):
+        return {root:fileStamp(root)}
+    stamps = {root:DIRECTORY}
+    if depth < 0:
+        return stamps
+    try:
+        entries = sorted(os.scandir(root),key=lambda entry: entry.name)
+    except OSError:
+        return stamps
+    for entry in entries:
+        if entry.name.startswith('.') or entry.name.endswith(CACHE_SUFFIXES):
+            continue
+        if entry.is_dir():
+            stamps.update(treeStamps(entry.path,depth-1))
+        else:
+            stamps[entry.path] = fileStamp(entry.path)
+    return stamps
+
+class ReportManifest:
+    """ Per stage record of a report's inputs, artifacts and slides
+        - stages are fresh when their inputs match the last build and their artifacts still exist
+        - values such as command line options can be recorded as inputs next to file stamps
+    """
+
+    def __init__(self,filePath):
+        self.filePath = filePath
+        self.previous = {}
+        try:
+            with open(filePath) as fp:
+                manifest = json.load(fp)
+            if manifest.get('version') == MANIFEST_VERSION:
+                self.previous = manifest.get('stages',{})
+                self.report = manifest.get('report')
+        except (OSError,ValueError,AttributeError):
+            pass
+        if not self.previous:
+            self.report = None
+        self.stages = {}
+
+    def isFresh(self,stage,inputs):
+        record = self.previous.get(stage)
+        if record is None or record['inputs'] != _jsonable(inputs):
+            return False
+        return all(fileStamp(artifact) is not None for artifact in record.get('artifacts',[]))
+
+    def artifacts(self,stage):
+        return self.previous.get(stage,{}).get('artifacts',[])
+
+    def data(self,stage):
+        return self.previous.get(stage,{}).get('data')
+
+    def record(self,stage,inputs,slides=None,artifacts=None,data=None):
+        self.stages[stage] = {'inputs':_jsonable(inputs),'slides':slides or [],
+                              'artifacts':artifacts or [],'data':data}
+
+    def staleStages(self):
+        #stages recorded in this run whose inputs differ from the last build
+        return [stage for stage,record in self.stages.items()
+                if self.previous.get(stage,{}).get('inputs') != record['inputs']]
+
+    def reportIsCurrent(self,stages):
+        #the last report exists unchanged and every stage it was built from is still fresh
+        if self.report is None or fileStamp(self.report['path']) != self.report['stamp']:
+            return False
+        return set(self.previous) == set(stages) and all(self.isFresh(stage,inputs) for stage,inputs in stages.items())
+
+    def carryOver(self,reportPath):
+        """ Records the last report, built from the same inputs, as reportPath and returns it
+            - a rerun on a later date copies the report to that day's name instead of returning
+              the old one
+        """
+        if os.path.abspath(reportPath) != self.report['path']:
+            tmpPath = "%s.%d.%d.tmp" % (reportPath,os.getpid(),threading.get_ident())
+            try:
+                shutil.copyfile(self.report['path'],tmpPath)
+                os.replace(tmpPath,reportPath)
+            finally:
+                if os.path.exists(tmpPath):
+                    os.remove(tmpPath)
+        self.stages = dict(self.previous)
+        self.save(reportPath)
+        return reportPath
+
+    def save(self,reportPath):
+        self.report = {'path':os.path.abspath(reportPath),'stamp':fileStamp(reportPath)}
+        manifest = {'version':MANIFEST_VERSION,'report':self.report,'stages':self.stages}
+        #written to a temp file and renamed so a concurrent rerun never reads half a manifest
+        tmpPath = "%s.%d.tmp" % (self.filePath,os.getpid())
+        try:
+            with open(tmpPath,'w') as fp:
+                json.dump(manifest,fp,indent=1)
+            os.replace(tmpPath,self.filePath)
+        except OSError:
+            if os.path.exists(tmpPath):
+                os.remove(tmpPath)
+
+def _jsonable(value):
+    #tuples and numpy scalars come back from json as lists and plain numbers
+    return json.loads(json.dumps(value,default=str))
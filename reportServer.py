@@ -0,0 +1,186 @@
+import os
+import sys
+import stat
+import json
+import signal
+import socket
+import tempfile
+import threading
+import traceback
+import socketserver
+import multiprocessing
+import argparse as argparse
+
+
+#### LOCAL REPORT SERVER ####
+#a long running process that keeps numpy, pandas, matplotlib, python-pptx, the template and
+#the in-memory metadata, ROI and image hash caches warm. pptGeneration.py hands its job to the server
+#over a Unix socket when one is running and builds in-process otherwise. Requests and responses are
+#single lines of JSON
+SOCKET_ENV = 'PPT_REPORT_SOCKET'
+SOCKET_NAME = 'pptReportServer.sock'
+DEFAULT_CONCURRENCY = 2
+CONNECT_TIMEOUT = 5
+#the modules whose functions the build's process pools run, imported once by the fork server
+POOL_MODULES = ['numpy','matplotlib','mediaCache','binPlotForces_v3_0','pptGeneration']
+
+def socketPath():
+    #one server per user, in the user's runtime directory or a private directory of the temp
+    #directory, PPT_REPORT_SOCKET points clients and server somewhere else
+    runtimeDir = os.environ.get('XDG_RUNTIME_DIR') or os.path.join(tempfile.gettempdir(),'pptReportServer-%d' % (os.getuid()))
+    return os.environ.get(SOCKET_ENV,os.path.join(runtimeDir,SOCKET_NAME))
+
+def privateDir(dirPath):
+    #created 0700, an existing one must be a directory of this user closed to everyone else
+    os.makedirs(dirPath,mode=0o700,exist_ok=True)
+    dirStat = os.lstat(dirPath)
+    if not stat.S_ISDIR(dirStat.st_mode) or dirStat.st_uid != os.getuid() or dirStat.st_mode & 0o077:
+        sys.exit("%s is not a private directory of this user, refusing to listen in it" % (dirPath))
+
+def requestReport(cwd,argv,serverPath=None):
+    """ Sends a pptGeneration command line to the running server and waits for the reports
+        - returns the server's response {'ok','reports','failed','error'}, or None when no
+          server is listening so the caller can build the report itself
+    """
+    serverPath = socketPath() if serverPath is None else serverPath
+    try:
+        serverStat = os.stat(serverPath)
+    except OSError:
+        return None
+    if serverStat.st_uid != os.getuid():
+        #a socket someone else put there never gets the job
+        return None
+    with socket.socket(socket.AF_UNIX,socket.SOCK_STREAM) as sock:
+        sock.settimeout(CONNECT_TIMEOUT)
+        try:
+            sock.connect(serverPath)
+        except OSError:
+            #a stale socket left by a server that did not shut down cleanly, or one that hangs
+            return None
+        #the build itself takes as long as it takes
+        sock.settimeout(None)
+        sock.sendall(json.dumps({'cwd':cwd,'argv':list(argv)}).encode() + b'\n')
+        with sock.makefile('r') as fp:
+            line = fp.readline()
+    if not line:
+        return None
+    return json.loads(line)
+
+
+class ReportServer(socketserver.ThreadingMixIn,socketserver.UnixStreamServer):
+    """ Accepts report requests on a Unix socket, at most concurrency of them build at once and the
+        rest wait their turn
+    """
+    daemon_threads = True
+
+    def __init__(self,serverPath,concurrency=DEFAULT_CONCURRENCY):
+        import pptGeneration
+        self.pptGeneration = pptGeneration
+        self.slots = threading.BoundedSemaphore(concurrency)
+        self._templateLock = threading.Lock()
+        self._template = None
+        self._templateStamp = None
+        self.warm()
+        socketserver.UnixStreamServer.__init__(self,serverPath,ReportHandler)
+
+    def warm(self):
+        #everything a report build pulls in is loaded before the first request arrives
+        print("Loading libraries...")
+        import numpy
+        import pandas
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.figure
+        import pptx
+        import deckMedia
+        import pptTable
+        self.template()
+
+    def template(self):
+        #the template file's bytes, read again only if the file changes, each build parses its own copy
+        templatePath = self.pptGeneration.templatePath
+        fileStat = os.stat(templatePath)
+        stamp = (fileStat.st_mtime_ns,fileStat.st_size)
+        with self._templateLock:
+            if self._templateStamp != stamp:
+                print("Reading template %s..." % (templatePath))
+                with open(templatePath,'rb') as fp:
+                    self._template = fp.read()
+                self._templateStamp = stamp
+            return self._template
+
+    def build(self,request):
+        args = self.pptGeneration.parseArgs(request['argv'])
+        with self.slots:
+            print("Building report for %s: %s" % (request['cwd'],' '.join(request['argv'])))
+            reports,failed = self.pptGeneration.generate(request['cwd'],args,template=self.template())
+        return {'ok':True,'reports':reports,'failed':failed,'error':None}
+
+
+class ReportHandler(socketserver.StreamRequestHandler):
+
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            return
+        try:
+            response = self.server.build(json.loads(line))
+        except SystemExit as error:
+            #argparse exits on a bad command line
+            response = {'ok':False,'reports':[],'failed':[],'error':"invalid arguments (%s)" % (error)}
+        except Exception as error:
+            traceback.print_exc()
+            response = {'ok':False,'reports':[],'failed':[],'error':str(error)}
+        self.wfile.write(json.dumps(response).encode() + b'\n')
+
+
+def _stop(signum,frame):
+    raise KeyboardInterrupt
+
+def serve(serverPath=None,concurrency=DEFAULT_CONCURRENCY):
+    if serverPath is None and SOCKET_ENV not in os.environ:
+        privateDir(os.path.dirname(socketPath()))
+    serverPath = socketPath() if serverPath is None else serverPath
+    if os.path.exists(serverPath):
+        with socket.socket(socket.AF_UNIX,socket.SOCK_STREAM) as sock:
+            sock.settimeout(CONNECT_TIMEOUT)
+            try:
+                sock.connect(serverPath)
+            except OSError:
+                os.remove(serverPath)
+            else:
+                sys.exit("A report server is already listening on %s" % (serverPath))
+
+    #builds run in threads, so their process pools start workers from a fork server instead of
+    #forking a process whose other threads may hold locks
+    multiprocessing.set_start_method('forkserver',force=True)
+    multiprocessing.set_forkserver_preload(POOL_MODULES)
+    #the socket is created 0600, not opened up between bind and chmod
+    oldUmask = os.umask(0o077)
+    try:
+        server = ReportServer(serverPath,concurrency)
+    finally:
+        os.umask(oldUmask)
+    #kill and service managers stop the server as cleanly as Ctrl-C does
+    signal.signal(signal.SIGTERM,_stop)
+    print("Report server listening on %s, building %d reports at a time..." % (serverPath,concurrency))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Shutting down...")
+    finally:
+        server.server_close()
+        if os.path.exists(serverPath):
+            os.remove(serverPath)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog='Report Server',description='Keeps the report generator loaded and builds the reports\
+                                                                    pptGeneration.py asks for, Ctrl-C or SIGTERM stops it.')
+    parser.add_argument("-s","--socket", default=None,
+                        help='Unix socket to listen on, defaults to $%s or one per user in $XDG_RUNTIME_DIR or a private temp directory.' % (SOCKET_ENV))
+    parser.add_argument("-c","--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help='Number of reports built at once, later requests wait (default %d).' % (DEFAULT_CONCURRENCY))
+    args = parser.parse_args()
+
+    serve(args.socket,args.concurrency)
@@ -0,0 +1,65 @@
+import os
+import sys
+import time
+import argparse as argparse
+import subprocess
+
+installPath = os.path.dirname(os.path.realpath(__file__))
+
+#seconds allowed for a cold "--help" of each entry point, the interpreter itself is measured
+#first and subtracted so the budgets hold across machines
+STARTUP_BUDGETS = {
+    'pptGeneration.py':0.15,
+    'binPlotForces_v3_0.py':0.15,
+    'batchSummary.py':0.15,
+    'campaignIndex.py':0.15,
+    'coeffEngine.py':0.15,
+}
+
+
+def timeCommand(command,repeats):
+    #best of repeats, the first run also warms the filesystem cache
+    best = None
+    for n in range(repeats):
+        start = time.perf_counter()
+        subprocess.run(command,stdout=subprocess.DEVNULL,stderr=subprocess.DEVNULL,cwd=installPath)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best,elapsed)
+    return best
+
+def slowestImports(script,count):
+    #parses python -X importtime output for the imports with the largest cumulative time
+    result = subprocess.run([sys.executable,'-X','importtime',os.path.join(installPath,script),'--help'],
+                            stdout=subprocess.DEVNULL,stderr=subprocess.PIPE,text=True,cwd=installPath)
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        fields = line.split('|')
+        imports.append((int(fields[1]),fields[2].strip()))
+    return sorted(imports,reverse=True)[:count]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(prog='Startup Budget',description='Measures the cold start of each command line entry point\
+                                                                    against its budget.')
+    parser.add_argument("-r","--repeats", type=int, default=5,
+                        help='Runs per entry point, the best time is kept.')
+    parser.add_argument("-v","--verbose", action="store_true",
+                        help='Lists the slowest imports of each entry point.')
+    args = parser.parse_args()
+
+    baseline = timeCommand([sys.executable,'-c','pass'],args.repeats)
+    print("Interpreter start: %0.3f s" % (baseline))
+    overBudget = []
+    for script,budget in STARTUP_BUDGETS.items():
+        elapsed = timeCommand([sys.executable,os.path.join(installPath,script),'--help'],args.repeats) - baseline
+        status = 'ok' if elapsed <= budget else 'OVER'
+        print("\t%-24s %0.3f s (budget %0.3f s) %s" % (script,elapsed,budget,status))
+        if elapsed > budget:
+            overBudget.append(script)
+        if args.verbose:
+            for microseconds,module in slowestImports(script,5):
+                print("\t\t%8.1f ms  %s" % (microseconds/1000.0,module))
+    if overBudget:
+        sys.exit("Over startup budget: %s" % (' '.join(overBudget)))
@@ -0,0 +1,31 @@
+import os
+from bcParser_v1_0 import bcParser, clearCaseMemo
+
+
+def writeCase(casePath,endTime):
+    os.makedirs(os.path.join(casePath,'system'))
+    os.makedirs(os.path.join(casePath,'constant'))
+    with open(os.path.join(casePath,'caseSetup'),'w') as fp:
+        fp.write("[BC]\nINLETMAG = 40\nYAW = 0\n")
+    with open(os.path.join(casePath,'system','controlDict'),'w') as fp:
+        fp.write('application simpleFoam;\n#include "times"\n')
+    with open(os.path.join(casePath,'system','times'),'w') as fp:
+        fp.write("endTime %d;\n" % (endTime))
+    with open(os.path.join(casePath,'system','caseProperties'),'w') as fp:
+        fp.write("wheels { type rotatingWall; }\n")
+    with open(os.path.join(casePath,'constant','turbulenceProperties'),'w') as fp:
+        fp.write("simulationType RAS;\nRAS { RASModel kOmegaSST; }\n")
+
+
+def test_changedIncludeInvalidatesCaches(tmp_path):
+    writeCase(str(tmp_path / '001'),1500)
+    assert bcParser(str(tmp_path),'001').lastTime == '1500'
+    timesPath = str(tmp_path / '001' / 'system' / 'times')
+    with open(timesPath,'w') as fp:
+        fp.write("endTime 3000;\n")
+    fileStat = os.stat(timesPath)
+    os.utime(timesPath,ns=(fileStat.st_atime_ns,fileStat.st_mtime_ns + 10**9))
+    #the in-memory memo, then the cache file beside the trial
+    assert bcParser(str(tmp_path),'001').lastTime == '3000'
+    clearCaseMemo()
+    assert bcParser(str(tmp_path),'001').lastTime == '3000'
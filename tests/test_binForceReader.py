@@ -0,0 +1,113 @@
+import os
+import json
+from binForceReader import TimeIndex, loadHistory, readBinRow, CACHE_SUFFIX
+
+HEADER = "# Bins\n# x co-ords : 0.1 0.2\n# Time cd_0 cd_1\n"
+
+
+def writeBins(filePath,rows,comment=None):
+    lines = [HEADER]
+    for n,(time,values) in enumerate(rows):
+        if comment is not None and n == comment:
+            lines.append("# restarted\n")
+        lines.append("%g %s\n" % (time,' '.join("%0.4f" % (value) for value in values)))
+    with open(filePath,'w') as fp:
+        fp.write(''.join(lines))
+
+
+def test_indexRebuiltForFileRewrittenInPlace(tmp_path):
+    filePath = str(tmp_path / 'coeffs.dat')
+    writeBins(filePath,[(1,[0.1,0.2]),(2,[0.3,0.4])])
+    with TimeIndex(filePath) as timeIndex:
+        assert list(timeIndex.times) == [1,2]
+    #same header and size, other times and values
+    writeBins(filePath,[(3,[0.5,0.6]),(4,[0.7,0.8])])
+    with TimeIndex(filePath) as timeIndex:
+        assert list(timeIndex.times) == [3,4]
+        times,rows = timeIndex.rowSlice(0,2)
+        assert rows.tolist() == [[0.5,0.6],[0.7,0.8]]
+
+
+def test_indexExtendedForAppendedRows(tmp_path):
+    filePath = str(tmp_path / 'coeffs.dat')
+    writeBins(filePath,[(1,[0.1,0.2])])
+    with TimeIndex(filePath) as timeIndex:
+        writeBins(filePath,[(1,[0.1,0.2]),(2,[0.3,0.4])])
+        timeIndex.refresh()
+        assert list(timeIndex.times) == [1,2]
+    with TimeIndex(filePath) as timeIndex:
+        assert timeIndex.row(2)[1].tolist() == [0.3,0.4]
+
+
+def test_refreshReindexesRewrittenFile(tmp_path):
+    filePath = str(tmp_path / 'coeffs.dat')
+    writeBins(filePath,[(1,[0.1,0.2]),(2,[0.3,0.4])])
+    with TimeIndex(filePath) as timeIndex:
+        writeBins(filePath,[(5,[0.5,0.6]),(6,[0.7,0.8]),(7,[0.9,1.0])])
+        timeIndex.refresh()
+        assert list(timeIndex.times) == [5,6,7]
+
+
+def test_rowSliceSkipsCommentLines(tmp_path):
+    filePath = str(tmp_path / 'coeffs.dat')
+    writeBins(filePath,[(1,[0.1,0.2]),(2,[0.3,0.4]),(3,[0.5,0.6])],comment=1)
+    with TimeIndex(filePath) as timeIndex:
+        times,rows = timeIndex.rowSlice(0,3)
+        assert times.tolist() == [1,2,3]
+        assert rows.tolist() == [[0.1,0.2],[0.3,0.4],[0.5,0.6]]
+
+
+def touchLater(filePath):
+    #a rewrite inside the same timestamp tick would look unchanged to the (mtime, size) stamp
+    fileStat = os.stat(filePath)
+    os.utime(filePath,ns=(fileStat.st_atime_ns,fileStat.st_mtime_ns + 10**9))
+
+
+def test_historyCacheRebuiltForFileRewrittenInPlace(tmp_path):
+    filePath = str(tmp_path / 'coeffs.dat')
+    writeBins(filePath,[(1,[0.1,0.2]),(2,[0.3,0.4])])
+    xCoords,forceHeader,times,rows = loadHistory(filePath)
+    assert rows.tolist() == [[0.1,0.2],[0.3,0.4]]
+    #a rerun writes the same time steps with other coefficients, same size
+    writeBins(filePath,[(1,[0.5,0.6]),(2,[0.7,0.8])])
+    touchLater(filePath)
+    xCoords,forceHeader,times,rows = loadHistory(filePath)
+    assert times.tolist() == [1,2]
+    assert rows.tolist() == [[0.5,0.6],[0.7,0.8]]
+
+
+def test_historyCacheExtendedForAppendedRows(tmp_path):
+    filePath = str(tmp_path / 'coeffs.dat')
+    writeBins(filePath,[(1,[0.1,0.2])])
+    loadHistory(filePath)
+    writeBins(filePath,[(1,[0.1,0.2]),(2,[0.3,0.4])])
+    touchLater(filePath)
+    xCoords,forceHeader,times,rows = loadHistory(filePath)
+    assert rows.tolist() == [[0.1,0.2],[0.3,0.4]]
+    with open(os.path.join(filePath + CACHE_SUFFIX,'meta.json')) as fp:
+        assert json.load(fp)['stamp'] == [os.stat(filePath).st_mtime_ns,os.stat(filePath).st_size]
+
+
+def test_historyCacheWithdrawnMetaIsRebuilt(tmp_path):
+    #a crash between withdrawing the meta and writing the new one
+    filePath = str(tmp_path / 'coeffs.dat')
+    writeBins(filePath,[(1,[0.1,0.2])])
+    loadHistory(filePath)
+    metaPath = os.path.join(filePath + CACHE_SUFFIX,'meta.json')
+    with open(metaPath) as fp:
+        meta = json.load(fp)
+    with open(metaPath,'w') as fp:
+        json.dump(dict(meta,stamp=None,lastRowHash=None),fp)
+    writeBins(filePath,[(1,[0.5,0.6]),(2,[0.7,0.8])])
+    xCoords,forceHeader,times,rows = loadHistory(filePath)
+    assert rows.tolist() == [[0.5,0.6],[0.7,0.8]]
+
+
+def test_tailReaderSkipsCommentLines(tmp_path):
+    filePath = str(tmp_path / 'coeffs.dat')
+    writeBins(filePath,[(1,[0.1,0.2]),(2,[0.3,0.4]),(3,[0.5,0.6])],comment=2)
+    with open(filePath,'a') as fp:
+        fp.write("# run stopped\n")
+    assert readBinRow(filePath)[2] == [0.5,0.6]
+    assert readBinRow(filePath,2)[2] == [0.3,0.4]
+    assert readBinRow(filePath,2.5)[2] == []
@@ -0,0 +1,42 @@
+import os
+import pytest
+from binPlotForces_v3_0 import importBinData, BinPlotError
+from binForceReader import CACHE_SUFFIX
+
+HEADER = "# Bins\n# x co-ords : 0.1 0.2\n# Time cd_0 cd_1\n"
+
+
+def writeTrial(path,trial,rows):
+    timeDir = os.path.join(path,trial,'postProcessing','binForceCoeffs','100')
+    os.makedirs(timeDir,exist_ok=True)
+    filePath = os.path.join(timeDir,'binForceCoeffs_100.dat')
+    with open(filePath,'w') as fp:
+        fp.write(HEADER + ''.join("%d %0.4f %0.4f\n" % (time,time/1000,time/2000) for time in rows))
+    return filePath
+
+
+def test_endRowFromHistoryAndCsvLeftAlone(tmp_path):
+    path = str(tmp_path)
+    filePath = writeTrial(path,'001',range(90,101))
+    frameZ,frameX = importBinData(path,'001','100',csvDir=path)
+    assert frameX['cd'].tolist() == [0.1,0.05]
+    assert os.path.isdir(filePath + CACHE_SUFFIX)
+    csvPath = os.path.join(path,'001_cd_development.csv')
+    os.utime(csvPath,ns=(0,os.stat(filePath + CACHE_SUFFIX).st_mtime_ns + 10**9))
+    csvTime = os.stat(csvPath).st_mtime_ns
+    importBinData(path,'001','100',csvDir=path)
+    assert os.stat(csvPath).st_mtime_ns == csvTime
+    #another time makes other bins, the csv follows
+    frameZ,frameX = importBinData(path,'001','100',atTime=95,csvDir=path)
+    assert frameX['cd'].tolist() == [0.095,0.0475]
+    with open(csvPath) as fp:
+        assert '0.095' in fp.read()
+
+
+def test_fileWithoutRowsIsBinPlotError(tmp_path):
+    path = str(tmp_path)
+    filePath = writeTrial(path,'001',[])
+    with open(filePath,'a') as fp:
+        fp.write("# no rows written yet\n" * 10)
+    with pytest.raises(BinPlotError,match='trial 001'):
+        importBinData(path,'001','100',forwardAvg=50)
@@ -0,0 +1,88 @@
+import os
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import pytest
+from buildGraph import BuildGraph, BuildError
+
+
+def touch(filePath,mtime):
+    with open(filePath,'w') as fp:
+        fp.write(filePath)
+    os.utime(filePath,(mtime,mtime))
+
+
+def test_upToDateNodeSkippedAndStaleNodeRebuilt(tmp_path):
+    source = str(tmp_path / 'avg.csv')
+    plot = str(tmp_path / 'plot.png')
+    touch(source,100)
+    touch(plot,200)
+    calls = []
+    def makePlot(results):
+        calls.append('plot')
+        touch(plot,300)
+        return 'made'
+    def reusePlot(results):
+        return 'reused'
+
+    graph = BuildGraph()
+    graph.add('averages',outputs=[source])
+    graph.add('plot',makePlot,outputs=[plot],after=['averages'],reuse=reusePlot)
+    assert graph.run() == {'averages':None,'plot':'reused'}
+    assert graph.skipped == ['plot'] and calls == []
+
+    #an output of a node it comes after is newer
+    touch(source,250)
+    assert graph.run()['plot'] == 'made'
+    assert graph.rebuilt == ['plot'] and calls == ['plot']
+    assert graph.run(force=True)['plot'] == 'made'
+
+
+def test_sharedNodeRunsOnce(tmp_path):
+    calls = []
+    graph = BuildGraph()
+    graph.add('trials',lambda results: calls.append('trials') or 'rows')
+    graph.add('tables',lambda results: results['trials'],after=['trials'])
+    graph.add('plots',lambda results: results['trials'],after=['trials'])
+    results = graph.run()
+    assert calls == ['trials']
+    assert results['tables'] == results['plots'] == 'rows'
+
+
+def test_failedNodeStopsWhatComesAfter():
+    def fail(results):
+        raise ValueError('no averages')
+    calls = []
+    graph = BuildGraph()
+    graph.add('averages',fail)
+    graph.add('tables',lambda results: calls.append('tables'),after=['averages'])
+    with pytest.raises(BuildError,match='averages failed: no averages'):
+        graph.run()
+    assert calls == []
+
+
+def test_processStartingNodesOverlap():
+    #independent nodes that start process pools run side by side
+    spans = {}
+    def action(name):
+        def run(results):
+            start = time.monotonic()
+            with ProcessPoolExecutor(max_workers=2,mp_context=multiprocessing.get_context('forkserver')) as executor:
+                list(executor.map(time.sleep,[0.3,0.3]))
+            spans[name] = (start,time.monotonic())
+            return name
+        return run
+    graph = BuildGraph()
+    graph.add('development',action('development'))
+    graph.add('images',action('images'))
+    assert graph.run() == {'development':'development','images':'images'}
+    (developmentStart,developmentEnd),(imagesStart,imagesEnd) = spans['development'],spans['images']
+    assert developmentStart < imagesEnd and imagesStart < developmentEnd
+
+
+def test_cycleRejected():
+    graph = BuildGraph()
+    graph.add('a',lambda results: None,after=['b'])
+    graph.add('b',lambda results: None,after=['a'])
+    with pytest.raises(BuildError,match='dependency cycle'):
+        graph.run()
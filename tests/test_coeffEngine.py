@@ -0,0 +1,54 @@
+import math
+import numpy as np
+from campaignIndex import avgFilePath
+from coeffEngine import CoeffTable, loadCoeffs, CI_CDA, CI_CLA
+
+#CdA, ClA, ClfA, ClrA, CI CdA, CI ClA
+VALUES = [[0.30,-0.50,-0.20,-0.30,0.003,0.004],
+          [0.32,-0.40,-0.10,-0.30,0.004,0.003],
+          [0,0,0,0,0,0]]
+
+
+def test_deltaCisPropagated():
+    table = CoeffTable(['001','002','003'],VALUES)
+    deltaCoeffs,deltaCi,deltaPercentFront = table.deltas('001')
+    assert np.allclose(deltaCoeffs[1],[0.02,0.10,0.10,0])
+    assert math.isclose(deltaCi[1,0],math.hypot(VALUES[1][CI_CDA],VALUES[0][CI_CDA]))
+    assert math.isclose(deltaCi[1,1],math.hypot(VALUES[1][CI_CLA],VALUES[0][CI_CLA]))
+    assert math.isclose(deltaPercentFront[1],25 - 40)
+
+
+def test_referenceRowIsZero():
+    table = CoeffTable(['001','002','003'],VALUES)
+    for reference in ('002',1):
+        deltaCoeffs,deltaCi,deltaPercentFront = table.deltas(reference)
+        assert not deltaCoeffs[1].any() and not deltaCi[1].any() and deltaPercentFront[1] == 0
+    #the reference is left out of the delta table
+    assert [column[0] for column in table.deltaColumns('002')] == ['001','003']
+
+
+def test_trialWithoutAveragesHasNoPercentFront():
+    table = CoeffTable(['001','002','003'],VALUES)
+    assert np.isnan(table.percentFront[2])
+    assert table.resultColumns()[2][-1] == 'nan'
+    assert np.isnan(table.deltas('001')[2][2])
+
+
+def test_csvRowsKeepFullPrecision():
+    table = CoeffTable(['001','002'],VALUES[:2])
+    header,first,second = table.csvRows('001')
+    assert len(header) == len(first) == 15
+    assert first[1:5] == VALUES[0][:4] and second[-1] == 25 - 40
+
+
+def test_loadCoeffsMarksTrialsWithoutAverages(tmp_path):
+    path = str(tmp_path)
+    for trial,values in [('001',VALUES[0]),('002',VALUES[1])]:
+        (tmp_path / trial).mkdir()
+        #Time, CdA, ClA, ClfA, ClrA, two unused columns, CI CdA, CI ClA
+        with open(avgFilePath(path,trial),'w') as fp:
+            fp.write("Time,CdA,ClA,ClfA,ClrA,a,b,ciCdA,ciClA\n")
+            fp.write("1000,%s,0,0,%s\n" % (','.join(map(str,values[:4])),','.join(map(str,values[4:]))))
+    values,found = loadCoeffs(path,['001','002','003'])
+    assert found.tolist() == [True,True,False]
+    assert np.allclose(values,VALUES)
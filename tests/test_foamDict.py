@@ -0,0 +1,41 @@
+import pytest
+from foamDict import FoamDict, UnresolvedValue
+
+
+def test_includedEntriesReadUntilClose(tmp_path):
+    (tmp_path / 'included').write_text('inletMag 40;\nsub { yaw 5; }\n')
+    (tmp_path / 'caseProperties').write_text('#include "included"\nsimType RAS;\n')
+    foamDict = FoamDict(str(tmp_path / 'caseProperties'))
+    with foamDict:
+        assert foamDict['simType'] == 'RAS'
+        assert foamDict['inletMag'] == '40'
+        assert foamDict['sub']['yaw'] == '5'
+        included, = foamDict._included
+    assert included._buf.closed
+    assert foamDict._included == []
+
+
+def test_macrosExpandedFromEnclosingScopes(tmp_path):
+    (tmp_path / 'controlDict').write_text('finalTime 1500;\nendTime $finalTime;\n'
+                                          'sub { start ${finalTime}; range ($finalTime 2000); }\n')
+    with FoamDict(str(tmp_path / 'controlDict')) as controlDict:
+        assert controlDict['endTime'] == '1500'
+        assert controlDict['sub']['start'] == '1500'
+        assert controlDict['sub']['range'] == ['1500','2000']
+
+
+def test_unworkableValuesReadAsMissing(tmp_path):
+    (tmp_path / 'controlDict').write_text('a 2;\nendTime #calc "$a*750";\nwriteTime $undefined;\n')
+    with FoamDict(str(tmp_path / 'controlDict')) as controlDict:
+        assert controlDict.get('endTime') is None
+        assert controlDict.get('writeTime','latest') == 'latest'
+        with pytest.raises(UnresolvedValue):
+            controlDict['endTime']
+
+
+def test_closingSubDictLeavesParentMap(tmp_path):
+    (tmp_path / 'turbulenceProperties').write_text('LES { LESModel WALE; }\nsimulationType LES;\n')
+    with FoamDict(str(tmp_path / 'turbulenceProperties')) as turbProperties:
+        with turbProperties['LES'] as les:
+            assert les['LESModel'] == 'WALE'
+        assert turbProperties['simulationType'] == 'LES'
@@ -0,0 +1,53 @@
+import os
+from mediaCache import knownDigest, fileDigest, loadHashIndex, saveHashIndex, encodeImage, PLACED_WIDTH
+
+
+def test_digestForgottenWhenSourceChanges(tmp_path):
+    source = str(tmp_path / 'Front.png')
+    with open(source,'wb') as fp:
+        fp.write(b'render one')
+    hashIndex = {}
+    digest = fileDigest(source,hashIndex)
+    assert knownDigest(source,hashIndex) == digest
+    #a new render of the same size, only the mtime tells them apart
+    with open(source,'wb') as fp:
+        fp.write(b'render two')
+    fileStat = os.stat(source)
+    os.utime(source,ns=(fileStat.st_atime_ns,fileStat.st_mtime_ns + 10**9))
+    assert knownDigest(source,hashIndex) is None
+    assert fileDigest(source,hashIndex) != digest
+
+
+def test_savesMergeInsteadOfReplacing(tmp_path):
+    cacheDir = str(tmp_path / 'cache')
+    saveHashIndex(cacheDir,{'/a.png':[1,10,'aaa']})
+    saveHashIndex(cacheDir,{'/b.png':[1,10,'bbb'],'/a.png':[0,10,'old']})
+    assert loadHashIndex(cacheDir) == {'/a.png':[1,10,'aaa'],'/b.png':[1,10,'bbb']}
+
+
+def test_deckDigestsSavedOnClose(tmp_path):
+    from PIL import Image
+    from pptx import Presentation
+    from deckMedia import DeckMedia
+    source = str(tmp_path / 'Front.png')
+    Image.new('RGB',(4,4)).save(source)
+    cacheDir = str(tmp_path / 'cache')
+    media = DeckMedia(Presentation(),cacheDir,loadHashIndex(cacheDir))
+    digest = media.digest(source)
+    media.close()
+    assert loadHashIndex(cacheDir)[os.path.realpath(source)][2] == digest
+
+
+def test_wideImageDownscaledEvenWhenLarger():
+    import io
+    from PIL import Image, ImageDraw
+    #a flat line plot compresses so well that its resampled copy comes out bigger
+    plot = Image.new('RGB',(2149,1343),(255,255,255))
+    draw = ImageDraw.Draw(plot)
+    for x in range(0,2149,7):
+        draw.line([(x,0),(2148 - x,1342)],fill=(0,0,0))
+    source = io.BytesIO()
+    plot.save(source,format='PNG',optimize=True)
+    encoded = encodeImage(source.getvalue(),dpi=100)
+    with Image.open(io.BytesIO(encoded)) as image:
+        assert image.width == round(PLACED_WIDTH*100)
@@ -0,0 +1,41 @@
+import os
+from reportManifest import ReportManifest, treeStamps, fileStamp
+
+
+def test_treeStampsIgnoreReaderCaches(tmp_path):
+    timeDir = tmp_path / 'binForceCoeffs' / '0'
+    timeDir.mkdir(parents=True)
+    (timeDir / 'coeffs.dat').write_text("1 0.1\n")
+    stamps = treeStamps(str(tmp_path / 'binForceCoeffs'),depth=1)
+    #the readers leave their caches beside the source, bumping the directory mtime
+    (timeDir / 'coeffs.dat.tidx.npz').write_bytes(b'index')
+    (timeDir / 'coeffs.dat.npycache').mkdir()
+    os.utime(str(timeDir),ns=(0,0))
+    assert treeStamps(str(tmp_path / 'binForceCoeffs'),depth=1) == stamps
+    #a new source is still seen
+    (timeDir / 'coeffs_1.dat').write_text("1 0.2\n")
+    assert set(treeStamps(str(tmp_path / 'binForceCoeffs'),depth=1)) - set(stamps) == {str(timeDir / 'coeffs_1.dat')}
+
+
+def test_currentReportCarriedOverToTodaysPath(tmp_path):
+    source = tmp_path / 'avg.csv'
+    source.write_text("0.3\n")
+    stages = {'results':{'files':{str(source):fileStamp(str(source))}}}
+    oldReport = tmp_path / 'A_B_report_2026-10-17.pptx'
+    oldReport.write_bytes(b'deck')
+    manifest = ReportManifest(str(tmp_path / 'A_B_report.manifest.json'))
+    for stage,inputs in stages.items():
+        manifest.record(stage,inputs)
+    manifest.save(str(oldReport))
+
+    manifest = ReportManifest(str(tmp_path / 'A_B_report.manifest.json'))
+    assert manifest.reportIsCurrent(stages)
+    newReport = str(tmp_path / 'A_B_report_2026-10-18.pptx')
+    assert manifest.carryOver(newReport) == newReport
+    with open(newReport,'rb') as fp:
+        assert fp.read() == b'deck'
+    #the manifest now points at today's report and the inputs are still current
+    manifest = ReportManifest(str(tmp_path / 'A_B_report.manifest.json'))
+    assert manifest.report['path'] == os.path.abspath(newReport)
+    assert manifest.reportIsCurrent(stages)
+    assert not [name for name in os.listdir(str(tmp_path)) if name.endswith('.tmp')]
@@ -0,0 +1,21 @@
+import os
+import pytest
+from reportServer import privateDir, requestReport
+
+
+def test_privateDirCreatedClosed(tmp_path):
+    dirPath = str(tmp_path / 'server')
+    privateDir(dirPath)
+    assert os.stat(dirPath).st_mode & 0o777 == 0o700
+
+
+def test_privateDirRefusesOpenDirectory(tmp_path):
+    dirPath = tmp_path / 'server'
+    dirPath.mkdir()
+    os.chmod(str(dirPath),0o755)
+    with pytest.raises(SystemExit):
+        privateDir(str(dirPath))
+
+
+def test_noServerBuildsLocally(tmp_path):
+    assert requestReport(str(tmp_path),['-t','002'],serverPath=str(tmp_path / 'missing.sock')) is None